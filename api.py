@@ -1,5 +1,4 @@
 import os
-import certifi
 import httpx
 from openai import OpenAI
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -18,7 +17,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # --- MongoDB Client Import ---
-from pymongo import MongoClient
+import mongo_registry
 
 # --- JWT Imports and Configuration ---
 import jwt
@@ -121,7 +120,7 @@ app.add_middleware(SessionMiddleware, secret_key="supersecretkey")
 @app.on_event("startup")
 async def startup_db_client():
     print("Connecting to MongoDB...")
-    app.state.mongo_client = MongoClient(MONGO_URI, tlsCAFile=certifi.where())
+    app.state.mongo_client = mongo_registry.get_client(MONGO_URI)
     app.state.db = app.state.mongo_client["chatSaaS"]
     app.state.users_collection = app.state.db["users_creds"]
     app.state.chats_collection = app.state.db["chats"]
@@ -136,8 +135,8 @@ async def startup_db_client():
 @app.on_event("shutdown")
 async def shutdown_db_client():
     print("Closing MongoDB connection...")
-    if hasattr(app.state, 'mongo_client') and app.state.mongo_client:
-        app.state.mongo_client.close()
+    # Closes every pooled client in the process, including those used by back_end_llm.
+    mongo_registry.close_all()
     print("MongoDB connection closed.")
 
 
@@ -178,6 +177,11 @@ from front_end_llm.prompts import SYSTEM_PROMPT, RETRY_PROMPT_SUFFIX, NEXT_QUEST
 async def health_check():
     return SuccessMessageResponse(message="healthy")
 
+# MongoDB connection pool metrics, per client
+@app.get("/api/health/mongo")
+async def mongo_pool_health():
+    return mongo_registry.pool_metrics()
+
 # --- Auth Endpoints (These are typically kept as they are) ---
 
 @app.post("/api/auth/signup", response_model=AuthSuccessResponse, responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}})
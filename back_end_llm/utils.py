@@ -6,7 +6,7 @@ from typing import List, Optional, Tuple
 from .pydantic_models import ConversationEntry
 from pymongo.collection import Collection
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from mongo_registry import get_client
 import os
 
 load_dotenv()
@@ -17,13 +17,14 @@ MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
 MONGO_COLLECTION_NAME = os.getenv("MONGO_COLLECTION_NAME")
 
 # ------------------ MongoDB Utilities ------------------
+# Clients come from the process-wide registry, so these calls reuse one pooled connection per URL.
 def get_mongo_collection() -> Collection:
-    client = MongoClient(MONGODB_URL)
+    client = get_mongo_client()
     db = client[MONGO_DB_NAME]
     return db[MONGO_COLLECTION_NAME]
 
 def get_mongo_client():
-    return MongoClient(MONGODB_URL)
+    return get_client(MONGODB_URL)
 
 def fetch_latest_session_from_mongo() -> Optional[List[ConversationEntry]]:
     client = get_mongo_client()
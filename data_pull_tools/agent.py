@@ -3,9 +3,10 @@ import os
 from pydantic_ai import Agent
 
 # Import all tools
-from youtube_scraper_tool import generate_product_summary
-from hacker_news_tool import hn_scrape_tool
-from website_scraper_tool import scrape_website_tool_async
+from youtube_scraper_tool import generate_product_summary, generate_product_summaries
+from hacker_news_tool import hn_scrape_tool, hn_scrape_batch_tool
+from website_scraper_tool import scrape_company_website
+from company_collector import collect_companies_tool
 from dotenv import load_dotenv
 import os
 
@@ -15,12 +16,19 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 # Create the unified agent
 agent = Agent(
     tools=[
+        collect_companies_tool,
         generate_product_summary,
+        generate_product_summaries,
         hn_scrape_tool,
-        scrape_website_tool_async
+        hn_scrape_batch_tool,
+        scrape_company_website
     ],
     model="gpt-4o",
-    system_prompt="You are an intelligent data collector that can scrape YouTube videos, Hacker News posts, and company websites based on user requests."
+    system_prompt=(
+        "You are an intelligent data collector that can scrape YouTube videos, Hacker News posts, and company websites based on user requests. "
+        "When the user wants everything about one or more companies, call collect_companies_tool once with all of them; "
+        "it runs every collector in parallel. Use the individual tools only for a single source."
+    )
 )
 
 # Optional run block
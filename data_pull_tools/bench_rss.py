@@ -0,0 +1,95 @@
+# bench_rss.py
+# Measures news ingestion against a local fake feed server: the old one-topic-at-a-time feedparser path
+# vs AsyncNewsFetcher on a cold run and on a revalidation run where every feed answers 304.
+# Usage: python bench_rss.py [topics] [latency_seconds]
+import sys
+import time
+import asyncio
+import hashlib
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import rssdb
+from rssdb import AsyncNewsFetcher, GoogleNewsFetcher
+
+LATENCY = 0.2  # seconds the fake server waits before answering each request
+ITEMS_PER_FEED = 20
+LAST_MODIFIED = formatdate(usegmt=True)
+
+
+def build_feed(topic: str) -> bytes:
+    items = "".join(
+        f"<item><title>{topic} story {i}</title><link>https://news.example.com/{hashlib.md5(topic.encode()).hexdigest()}/{i}</link>"
+        f"<pubDate>{LAST_MODIFIED}</pubDate><description>&lt;p&gt;About {topic}, part {i}&lt;/p&gt;</description></item>"
+        for i in range(ITEMS_PER_FEED)
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>{topic}</title>{items}</channel></rss>'.encode("utf-8")
+
+
+class FakeFeedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        topic = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+        etag = f'"{hashlib.md5(topic.encode()).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = build_feed(topic)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeFeedHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(topics: int, latency: float):
+    global LATENCY
+    LATENCY = latency
+    server = start_fake_server()
+    rssdb.GOOGLE_NEWS_RSS = f"http://127.0.0.1:{server.server_port}/rss/search?q={{query}}"
+    names = [f"company {i}" for i in range(topics)]
+    print(f"{topics} topics, {latency:.2f}s latency per request")
+
+    start = time.perf_counter()
+    serial_articles = 0
+    for name in names:
+        fetcher = GoogleNewsFetcher(name, max_results=ITEMS_PER_FEED)
+        fetcher.fetch_news()
+        serial_articles += len(fetcher.articles)
+    serial = time.perf_counter() - start
+    print(f"{'serial feedparser':>20}: {serial:6.2f}s, {serial_articles} articles")
+
+    validators = {}
+    for label in ("async cold", "async revalidate"):
+        fetcher = AsyncNewsFetcher(max_results=ITEMS_PER_FEED, validators=validators)
+        start = time.perf_counter()
+        results = asyncio.run(fetcher.fetch_topics(names))
+        elapsed = time.perf_counter() - start
+        articles = sum(len(a) for a in results.values())
+        print(f"{label:>20}: {elapsed:6.2f}s, {articles} articles, {fetcher.stats}, "
+              f"{topics / elapsed:.0f} topics/s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 50, float(args[1]) if len(args) > 1 else LATENCY)
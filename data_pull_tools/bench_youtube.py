@@ -0,0 +1,158 @@
+# bench_youtube.py
+# Measures caption fetching for one product against a local fake video source, serial vs the worker pool,
+# and the throughput of the local rolling-caption merge.
+# Usage: python bench_youtube.py [videos] [latency_seconds]
+#        python bench_youtube.py merge [transcripts] [minutes_per_video]
+import sys
+import json
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from urllib.request import urlopen
+
+import youtube_scraper_tool
+from youtube_scraper_tool import HF_MODEL, HF_TOKEN, YTDLP_WORKERS, VideoProcessor
+
+LATENCY = 0.3  # seconds the fake source waits before answering each request
+
+SAMPLE_VTT = """WEBVTT
+Kind: captions
+Language: en
+
+00:00:00.000 --> 00:00:02.000
+this product ships with a fast setup
+
+00:00:02.000 --> 00:00:04.000
+and a dashboard for every team
+"""
+
+
+class FakeSourceHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(LATENCY)
+        kind, _, video_id = self.path.strip("/").partition("/")
+        if kind == "info":
+            body = json.dumps({
+                "id": video_id,
+                "title": f"Video {video_id}",
+                "subtitles": {"en": [{"ext": "vtt", "url": f"{self.server.base_url}/vtt/{video_id}"}]},
+            }).encode("utf-8")
+        elif kind == "vtt":
+            body = SAMPLE_VTT.encode("utf-8")
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_source():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSourceHandler)
+    server.base_url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class FakeYoutubeDL:
+    """Stands in for yt_dlp.YoutubeDL, answering from the local fake source."""
+
+    base_url = ""
+
+    def __init__(self, opts):
+        self.opts = opts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def extract_info(self, url, download=False):
+        video_id = parse_qs(urlparse(url).query)["v"][0]
+        with urlopen(f"{self.base_url}/info/{video_id}") as response:
+            return json.load(response)
+
+
+class InMemoryTranscriptStore:
+    """Stands in for db_utils.transcript_db so the benchmark needs no database."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def get_transcript(self, video_id):
+        return self.docs.get(video_id)
+
+    def add_product(self, video_id, product):
+        self.docs[video_id]["products"].append(product)
+
+    def save_transcript(self, video_id, video_url, video_title, raw_vtt, transcript, product):
+        self.docs[video_id] = {"video_id": video_id, "transcript": transcript, "products": [product]}
+
+
+async def run_once(processor, urls):
+    store = InMemoryTranscriptStore()
+    youtube_scraper_tool.transcript_db = store
+    start = time.perf_counter()
+    await asyncio.gather(*(processor.download_and_clean(url, "bench product") for url in urls))
+    return time.perf_counter() - start, len(store.docs)
+
+
+def main(videos: int, latency: float):
+    global LATENCY
+    LATENCY = latency
+    server = start_fake_source()
+    FakeYoutubeDL.base_url = server.base_url
+    youtube_scraper_tool.yt_dlp.YoutubeDL = FakeYoutubeDL
+
+    urls = [f"https://www.youtube.com/watch?v=vid{i}" for i in range(videos)]
+    print(f"{videos} videos, {latency:.2f}s latency per request")
+    for label, workers in [("serial", 1), ("pool", YTDLP_WORKERS)]:
+        processor = VideoProcessor(HF_TOKEN, HF_MODEL, executor=ThreadPoolExecutor(max_workers=workers))
+        processor.clean_text = lambda text: text  # keep the remote LLM out of the measurement
+        elapsed, written = asyncio.run(run_once(processor, urls))
+        print(f"{label:>7} ({workers:>2} workers): {elapsed:6.2f}s, {written} transcripts")
+    server.shutdown()
+
+
+def _vtt_time(seconds):
+    return f"{int(seconds // 3600):02d}:{int(seconds % 3600 // 60):02d}:{seconds % 60:06.3f}"
+
+
+def build_rolling_vtt(minutes, words_per_line=8):
+    """Auto-caption style VTT: every cue repeats the previous line, plus a 10ms repeat cue."""
+    vocabulary = "the new model makes setup fast and every team gets a shared dashboard today".split()
+    blocks = ["WEBVTT\nKind: captions\nLanguage: en"]
+    previous, t, i = "", 0.0, 0
+    while t < minutes * 60:
+        line = " ".join(vocabulary[(i + j) % len(vocabulary)] for j in range(words_per_line))
+        timed = "".join(f"<{_vtt_time(t + j * 0.3)}><c> {w}</c>" for j, w in enumerate(line.split()))
+        blocks.append(f"{_vtt_time(t)} --> {_vtt_time(t + 2.5)} align:start position:0%\n{previous or ' '}\n{timed}")
+        blocks.append(f"{_vtt_time(t + 2.5)} --> {_vtt_time(t + 2.51)} align:start position:0%\n{line}\n ")
+        previous, t, i = line, t + 2.51, i + words_per_line
+    return "\n\n".join(blocks) + "\n"
+
+
+def bench_merge(transcripts, minutes):
+    vtt = build_rolling_vtt(minutes)
+    start = time.perf_counter()
+    for _ in range(transcripts):
+        text = VideoProcessor.merge_vtt_cues(vtt, rolling=True)
+    elapsed = time.perf_counter() - start
+    print(f"{transcripts} transcripts of {minutes} min ({len(vtt) / 1e3:.0f} kB VTT -> {len(text) / 1e3:.1f} kB text): "
+          f"{elapsed:.2f}s, {transcripts / elapsed:.0f} transcripts/s")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == "merge":
+        bench_merge(int(args[1]) if len(args) > 1 else 200, float(args[2]) if len(args) > 2 else 5)
+    else:
+        main(int(args[0]) if args else 10, float(args[1]) if len(args) > 1 else LATENCY)
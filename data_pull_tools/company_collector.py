@@ -0,0 +1,102 @@
+# company_collector.py
+# Runs the website, Hacker News and YouTube collectors for companies concurrently, without
+# a model round trip between tools, and reports how long each collector took.
+import time
+import asyncio
+from typing import Dict, List, Optional
+from pydantic import BaseModel, HttpUrl
+from pydantic_ai import Tool
+
+from website_scraper_tool import ScraperInput, run_scraper_tool_logic
+from hacker_news_tool import new_client, scrape_hn_companies
+from youtube_scraper_tool import HF_MODEL, HF_TOKEN, VideoProcessor, collect_product_videos, summarize_product
+
+class CompanyInput(BaseModel):
+    name: str
+    url: HttpUrl
+    max_pages: int = 0  # 0 = no limit
+
+class CompanyBatchInput(BaseModel):
+    companies: List[CompanyInput]
+
+class CollectorResult(BaseModel):
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+class CompanyCollection(BaseModel):
+    name: str
+    website: CollectorResult
+    hacker_news: CollectorResult
+    youtube: CollectorResult
+    total_seconds: float
+
+async def _timed(coro) -> CollectorResult:
+    start = time.perf_counter()
+    try:
+        result = await coro
+        return CollectorResult(result=result, seconds=time.perf_counter() - start)
+    except Exception as e:
+        return CollectorResult(error=str(e), seconds=time.perf_counter() - start)
+
+async def _scrape_website(company: CompanyInput) -> dict:
+    output = await run_scraper_tool_logic(ScraperInput(url=company.url, max_pages=company.max_pages))
+    return output.model_dump()
+
+def _unwrap(result: CollectorResult) -> CollectorResult:
+    """Collectors report their own failures as {"error": ...}; surface them as errors."""
+    if isinstance(result.result, dict) and "error" in result.result:
+        return CollectorResult(error=result.result["error"], seconds=result.seconds)
+    return result
+
+async def collect_companies(companies: List[CompanyInput]) -> List[CompanyCollection]:
+    """
+    Collects every company in parallel. Each collector runs and is timed per company, so a failure
+    only affects that company's entry and each time is what that company waited for.
+    Hacker News requests share one pooled client; YouTube searches and video downloads run once
+    for the whole batch (so shared videos are fetched once) before each company is summarized.
+    """
+    start = time.perf_counter()
+    names = [company.name for company in companies]
+    videos = asyncio.ensure_future(collect_product_videos(VideoProcessor(HF_TOKEN, HF_MODEL), names))
+
+    async def hacker_news(client, name):
+        key = name.strip().lower()
+        return (await scrape_hn_companies([key], client))[key]
+
+    async def youtube(name):
+        return await summarize_product(name, (await videos).get(name, []))
+
+    async def collect(client, company) -> CompanyCollection:
+        website, hn, yt = await asyncio.gather(
+            _timed(_scrape_website(company)),
+            _timed(hacker_news(client, company.name)),
+            _timed(youtube(company.name)),
+        )
+        return CompanyCollection(
+            name=company.name,
+            website=website,
+            hacker_news=_unwrap(hn),
+            youtube=_unwrap(yt),
+            total_seconds=time.perf_counter() - start
+        )
+
+    try:
+        async with new_client() as client:
+            collections = await asyncio.gather(*(collect(client, company) for company in companies))
+    finally:
+        videos.cancel()
+
+    for c in collections:
+        print(f"⏱️ {c.name}: website {c.website.seconds:.1f}s, hacker news {c.hacker_news.seconds:.1f}s, "
+              f"youtube {c.youtube.seconds:.1f}s, total {c.total_seconds:.1f}s")
+    print(f"⏱️ All {len(collections)} companies: {time.perf_counter() - start:.1f}s")
+    return list(collections)
+
+async def collect_company(company: CompanyInput) -> CompanyCollection:
+    return (await collect_companies([company]))[0]
+
+@Tool
+async def collect_companies_tool(input: CompanyBatchInput) -> List[CompanyCollection]:
+    """Collect website, Hacker News and YouTube data for a list of companies in one call, all in parallel."""
+    return await collect_companies(input.companies)
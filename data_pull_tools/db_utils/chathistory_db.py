@@ -1,35 +1,115 @@
 from datetime import datetime
+from typing import Optional
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from db_utils.db_config import get_collection
 import os
 
 DB_NAME = os.getenv("CHAT_DB_NAME")
 COLLECTION_NAME = os.getenv("CHAT_COLLECTION_NAME")
+# Messages per bucket document; keeps long sessions well under the 16MB document limit.
+BUCKET_SIZE = int(os.getenv("CHAT_BUCKET_SIZE", "100"))
+APPEND_RETRIES = 5
 
 collection = get_collection(DB_NAME, COLLECTION_NAME)
+_indexes_ready = False
+
+def _ensure_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        # Covers the read's sort, including the _id tiebreak, so no in-memory sort is needed.
+        collection.create_index([("session_uuid", ASCENDING), ("first_ts", DESCENDING), ("_id", DESCENDING)])
+        # At most one open bucket per session, so concurrent appends can't start two.
+        collection.create_index(
+            [("session_uuid", ASCENDING)],
+            name="open_bucket",
+            unique=True,
+            partialFilterExpression={"open": True}
+        )
+        _indexes_ready = True
+
+def _close_full_buckets(session_uuid: str):
+    collection.update_many(
+        {"session_uuid": session_uuid, "open": True, "count": {"$gte": BUCKET_SIZE}},
+        {"$unset": {"open": ""}}
+    )
 
 def store_chat_message(session_uuid: str, question: str, answer: str, role: str = "user"):
+    """
+    Appends a message to the session's open bucket, starting a new bucket once it holds BUCKET_SIZE messages.
+
+    One upsert per message against the bucket flagged `open` with room left; the writer that fills it
+    clears the flag. The partial unique index allows one open bucket per session, so a concurrent
+    (or premature) insert fails instead of starting a second one: full open buckets are closed and
+    the append is retried. Pre-`open` and legacy documents never match and are read as older buckets.
+    """
+    _ensure_indexes()
+    now = datetime.utcnow()
     message = {
         "question": question,
         "answer": answer,
-        "timestamp": datetime.utcnow(),
+        "timestamp": now,
         "role": role
     }
 
-    existing = collection.find_one({"session_uuid": session_uuid})
-    if existing:
-        collection.update_one(
-            {"session_uuid": session_uuid},
-            {"$push": {"messages": message}}
-        )
-        return "Message added to existing session"
-    else:
-        collection.insert_one({
-            "session_uuid": session_uuid,
-            "messages": [message],
-            "created_at": datetime.utcnow()
-        })
-        return "New session created"
-
-def get_chat_history(session_uuid: str):
-    return collection.find_one({"session_uuid": session_uuid}, {"_id": 0})
+    for attempt in range(APPEND_RETRIES):
+        try:
+            bucket = collection.find_one_and_update(
+                {"session_uuid": session_uuid, "open": True, "count": {"$lt": BUCKET_SIZE}},
+                {
+                    "$push": {"messages": message},
+                    "$inc": {"count": 1},
+                    "$min": {"first_ts": now},
+                    "$max": {"last_ts": now},
+                    "$setOnInsert": {"created_at": now}
+                },
+                projection={"count": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            break
+        except DuplicateKeyError:
+            # Another bucket is open: either a concurrent writer just created it, or it is full and its
+            # writer has not closed it yet.
+            if attempt == APPEND_RETRIES - 1:
+                raise
+            _close_full_buckets(session_uuid)
 
+    if bucket["count"] >= BUCKET_SIZE:
+        collection.update_one({"_id": bucket["_id"]}, {"$unset": {"open": ""}})
+    if bucket["count"] == 1:  # this append created the bucket
+        return "Message added to a new session bucket"
+    return "Message added to existing session"
+
+def get_chat_history(session_uuid: str, limit: Optional[int] = None):
+    """
+    Returns {"session_uuid", "created_at", "messages"} with messages oldest first, or None for an unknown session.
+
+    With `limit`, only the newest buckets needed to cover the last `limit` messages are read
+    (and `created_at` is that of the oldest bucket read).
+    Sessions stored before bucketing (a single document without `first_ts`) are read as the oldest bucket.
+    """
+    cursor = collection.find(
+        {"session_uuid": session_uuid},
+        {"_id": 0, "messages": 1, "created_at": 1},
+        batch_size=2 if limit else 0
+    ).sort([("first_ts", DESCENDING), ("_id", DESCENDING)])
+
+    buckets, total = [], 0
+    for bucket in cursor:
+        buckets.append(bucket)
+        total += len(bucket.get("messages", []))
+        if limit is not None and total >= limit:
+            cursor.close()
+            break
+    if not buckets:
+        return None
+
+    messages = [message for bucket in reversed(buckets) for message in bucket.get("messages", [])]
+    if limit is not None:
+        messages = messages[-limit:] if limit > 0 else []
+    return {
+        "session_uuid": session_uuid,
+        "created_at": buckets[-1].get("created_at"),
+        "messages": messages
+    }
@@ -1,9 +1,16 @@
 # db_utils/db_config.py
 
 import os
-from pymongo import MongoClient
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
-import certifi
+
+# The pooled client registry is shared with the API and supervisor from the repository root.
+_ROOT = str(Path(__file__).resolve().parents[2])
+if _ROOT not in sys.path:
+    sys.path.append(_ROOT)
+
+from mongo_registry import get_client  # noqa: E402
 
 # Load environment variables from .env file
 load_dotenv()
@@ -11,8 +18,8 @@ load_dotenv()
 # Read MongoDB URI from environment variables
 MONGO_URI = os.getenv("MONGO_URI")
 
-# Create a MongoDB client
-client = MongoClient(MONGO_URI, tlsCAFile=certifi.where())
+# Shared, pooled MongoDB client (see mongo_registry.py at the repository root)
+client = get_client(MONGO_URI)
 
 def get_collection(db_name: str, collection_name: str):
     """
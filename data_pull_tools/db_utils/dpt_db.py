@@ -1,10 +1,13 @@
 # db_utils/dpt_db.py
 
+import json
 from datetime import datetime
+from typing import Iterator, Optional
 from db_utils.db_config import get_collection
 
 DB_NAME = "company"
 COLLECTION_NAME = "company_data"
+EXPORT_BATCH_SIZE = 100
 
 collection = get_collection(DB_NAME, COLLECTION_NAME)
 
@@ -20,8 +23,39 @@ def insert_agent_result(query: str, result: str):
     collection.insert_one(document)
     print("[✅] Agent result stored in MongoDB.")
 
+def iter_results(filter: Optional[dict] = None, projection: Optional[dict] = None,
+                 batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[dict]:
+    """
+    Yields stored documents one at a time; the cursor fetches `batch_size` documents per round trip.
+    """
+    cursor = collection.find(filter or {}, projection or {"_id": 0}, batch_size=batch_size)
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
+
+def iter_ndjson(filter: Optional[dict] = None, projection: Optional[dict] = None,
+                batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """
+    Yields one JSON line per document; dates and ids are written as strings.
+    """
+    for doc in iter_results(filter, projection, batch_size):
+        yield json.dumps(doc, ensure_ascii=False, default=str) + "\n"
+
+def export_ndjson(path: str, filter: Optional[dict] = None, projection: Optional[dict] = None,
+                  batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    """
+    Writes matching documents to an NDJSON file as they arrive. Returns the number written.
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for line in iter_ndjson(filter, projection, batch_size):
+            f.write(line)
+            count += 1
+    return count
+
 def get_all_results():
     """
-    Retrieves all stored agent results.
+    Retrieves all stored agent results. Prefer iter_results/export_ndjson for large collections.
     """
-    return list(collection.find({}, {"_id": 0}))
+    return list(iter_results())
@@ -0,0 +1,52 @@
+# db_utils/hn_posts_db.py
+
+from typing import List
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from db_utils.db_config import get_collection
+
+DB_NAME = "company"
+COLLECTION_NAME = "hn_posts"
+
+collection = get_collection(DB_NAME, COLLECTION_NAME)
+_indexes_ready = False
+
+
+def _ensure_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        collection.create_index([("objectID", ASCENDING)], unique=True)
+        collection.create_index([("companies", ASCENDING), ("created_at_i", DESCENDING)])
+        _indexes_ready = True
+
+
+def upsert_posts(company: str, posts: List[dict]) -> int:
+    """
+    Inserts or refreshes Hacker News posts and links them to a company. Returns the number of new posts.
+    """
+    if not posts:
+        return 0
+    _ensure_indexes()
+    result = collection.bulk_write(
+        [
+            UpdateOne(
+                {"objectID": post["objectID"]},
+                {"$set": post, "$addToSet": {"companies": company}},
+                upsert=True
+            )
+            for post in posts
+        ],
+        ordered=False
+    )
+    return result.upserted_count
+
+
+def get_posts(company: str, limit: int = 50) -> List[dict]:
+    """
+    Returns a company's most recent stored posts, newest first.
+    """
+    cursor = collection.find({"companies": company}, {"_id": 0, "companies": 0})
+    return list(cursor.sort("created_at_i", DESCENDING).limit(limit))
+
+
+def count_posts(company: str) -> int:
+    return collection.count_documents({"companies": company})
@@ -0,0 +1,102 @@
+# db_utils/json_stream.py
+# Incremental JSON reading for exports too large to load at once: values are decoded one at a time
+# from a text file, holding roughly one value in memory. Shared by googlesearchdb and the supervisor.
+
+import re
+import json
+from typing import Iterator
+
+READ_CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = re.compile(r"\s*")
+# Characters that can continue a number or a true/false/null literal.
+_SCALAR_TAIL = re.compile(r"[0-9a-zA-Z.+\-]*")
+_DECODER = json.JSONDecoder()
+
+
+class JsonStreamReader:
+    """Decodes one JSON value at a time from a text file, holding roughly one value in memory."""
+
+    def __init__(self, f, chunk_size: int = READ_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int) -> bool:
+        data = self.f.read(size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character, without consuming it ("" at end of file)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill(self.chunk_size):
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} but found {found!r}")
+        self.pos += 1
+
+    def _complete(self, obj, end: int) -> bool:
+        # Strings, objects and arrays end at their closing character. A number or literal whose match
+        # runs to the end of the buffer may continue in the next chunk ("1." + "5", "1e" + "3").
+        if self.eof or isinstance(obj, (str, dict, list)):
+            return True
+        return _SCALAR_TAIL.match(self.buf, end).end() < len(self.buf)
+
+    def value(self):
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                obj, end = _DECODER.raw_decode(self.buf, self.pos)
+                if self._complete(obj, end):
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Incomplete value: read more, doubling the read so large values aren't re-decoded too often.
+            self._fill(size)
+            size *= 2
+
+
+def iter_json_items(path: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator:
+    """
+    Items of a top-level JSON array (or the value itself if it is not an array), decoded one at a time
+    so only the item being read is held in memory. NDJSON files are read line by line.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".ndjson", ".jsonl")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        reader = JsonStreamReader(f, chunk_size)
+        if reader.peek() != "[":
+            yield reader.value()
+            return
+        reader.pos += 1
+        if reader.peek() == "]":
+            return
+        while True:
+            yield reader.value()
+            char = reader.peek()
+            if char == ",":
+                reader.pos += 1
+            elif char == "]":
+                return
+            else:
+                raise ValueError(f"Expected ',' or ']' in {path} but found {char!r}")
@@ -1,8 +1,11 @@
 # main.py
 
-from fastapi import FastAPI, HTTPException
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from db_utils.chathistory_db import store_chat_message, get_chat_history
+from db_utils.dpt_db import EXPORT_BATCH_SIZE, iter_ndjson
 
 app = FastAPI()
 
@@ -26,11 +29,23 @@ async def save_chat(msg: ChatMessage):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/chat/{session_uuid}")
-async def fetch_chat(session_uuid: str):
+async def fetch_chat(session_uuid: str, limit: Optional[int] = None):
     try:
-        history = get_chat_history(session_uuid)
+        history = get_chat_history(session_uuid, limit=limit)
         if history:
             return history
         raise HTTPException(status_code=404, detail="Session not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/export/company_data")
+def export_company_data(
+    company: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to include, e.g. company,youtube"),
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=1000)
+):
+    filter = {"company": company.strip().lower()} if company else {}
+    projection = {"_id": 0}
+    if fields:
+        projection.update({field.strip(): 1 for field in fields.split(",") if field.strip()})
+    return StreamingResponse(iter_ndjson(filter, projection, batch_size), media_type="application/x-ndjson")
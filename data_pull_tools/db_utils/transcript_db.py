@@ -0,0 +1,82 @@
+# db_utils/transcript_db.py
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from pymongo import ASCENDING
+from db_utils.db_config import get_collection
+
+DB_NAME = "company"
+COLLECTION_NAME = "video_transcripts"
+TRANSCRIPT_MAX_AGE_DAYS = int(os.getenv("TRANSCRIPT_MAX_AGE_DAYS", "30"))
+
+collection = get_collection(DB_NAME, COLLECTION_NAME)
+_indexes_ready = False
+
+
+def _ensure_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        collection.create_index([("video_id", ASCENDING)], unique=True)
+        _indexes_ready = True
+
+
+def _is_fresh(doc: dict, max_age_days: int) -> bool:
+    fetched_at = doc.get("fetched_at")
+    if fetched_at is None:
+        return False
+    if fetched_at.tzinfo is None:
+        fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - fetched_at <= timedelta(days=max_age_days)
+
+
+def get_transcript(video_id: str, max_age_days: int = TRANSCRIPT_MAX_AGE_DAYS) -> Optional[dict]:
+    """
+    Returns the stored transcript for a video, or None if missing or older than `max_age_days`.
+    """
+    doc = collection.find_one({"video_id": video_id}, {"_id": 0})
+    if doc and _is_fresh(doc, max_age_days):
+        return doc
+    return None
+
+
+def get_transcripts(video_ids: List[str]) -> List[dict]:
+    """
+    Returns the stored transcripts for the given videos, in the order of `video_ids`.
+    """
+    docs = {
+        doc["video_id"]: doc
+        for doc in collection.find({"video_id": {"$in": list(video_ids)}}, {"_id": 0, "raw_vtt": 0})
+    }
+    return [docs[video_id] for video_id in video_ids if video_id in docs]
+
+
+def save_transcript(video_id: str, video_url: str, video_title: str,
+                    raw_vtt: Optional[str], transcript: str, product: str):
+    """
+    Inserts or refreshes a video's raw and cleaned transcript and links it to a product.
+    """
+    _ensure_indexes()
+    now = datetime.now(timezone.utc)
+    collection.update_one(
+        {"video_id": video_id},
+        {
+            "$set": {
+                "video_url": video_url,
+                "video_title": video_title,
+                "raw_vtt": raw_vtt,
+                "transcript": transcript,
+                "fetched_at": now
+            },
+            "$setOnInsert": {"created_at": now},
+            "$addToSet": {"products": product}
+        },
+        upsert=True
+    )
+
+
+def add_product(video_id: str, product: str):
+    """
+    Records that a stored video was also found for another product.
+    """
+    collection.update_one({"video_id": video_id}, {"$addToSet": {"products": product}})
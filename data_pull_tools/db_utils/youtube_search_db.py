@@ -0,0 +1,72 @@
+# db_utils/youtube_search_db.py
+
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from pymongo import ASCENDING
+from db_utils.db_config import get_collection
+
+DB_NAME = "company"
+COLLECTION_NAME = "youtube_searches"
+SEARCH_CACHE_TTL_HOURS = float(os.getenv("SEARCH_CACHE_TTL_HOURS", "24"))
+
+collection = get_collection(DB_NAME, COLLECTION_NAME)
+_indexes_ready = False
+
+
+def _ensure_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        collection.create_index([("query_key", ASCENDING)], unique=True)
+        # Let MongoDB drop expired searches; reads still check the age since the TTL monitor runs lazily.
+        ttl_seconds = int(SEARCH_CACHE_TTL_HOURS * 3600)
+        existing = next(
+            (index for index in collection.index_information().values() if index["key"] == [("searched_at", 1)]),
+            None
+        )
+        if existing is None:
+            collection.create_index([("searched_at", ASCENDING)], expireAfterSeconds=ttl_seconds)
+        elif existing.get("expireAfterSeconds") != ttl_seconds:
+            # The TTL is fixed when the index is built; collMod applies a changed SEARCH_CACHE_TTL_HOURS in place.
+            collection.database.command({
+                "collMod": collection.name,
+                "index": {"keyPattern": {"searched_at": 1}, "expireAfterSeconds": ttl_seconds}
+            })
+        _indexes_ready = True
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+def get_results(query: str, max_results: int, ttl_hours: float = SEARCH_CACHE_TTL_HOURS) -> Optional[List[str]]:
+    """
+    Returns cached video URLs for a query, or None if missing, expired, or searched with a smaller limit.
+    """
+    doc = collection.find_one({"query_key": normalize_query(query)}, {"_id": 0})
+    if not doc or doc.get("max_results", 0) < max_results:
+        return None
+    searched_at = doc["searched_at"]
+    if searched_at.tzinfo is None:
+        searched_at = searched_at.replace(tzinfo=timezone.utc)
+    if datetime.now(timezone.utc) - searched_at > timedelta(hours=ttl_hours):
+        return None
+    return doc["urls"][:max_results]
+
+
+def save_results(query: str, max_results: int, urls: List[str]):
+    """
+    Stores the video URLs returned for a query.
+    """
+    _ensure_indexes()
+    collection.update_one(
+        {"query_key": normalize_query(query)},
+        {"$set": {
+            "query": query,
+            "max_results": max_results,
+            "urls": urls,
+            "searched_at": datetime.now(timezone.utc)
+        }},
+        upsert=True
+    )
@@ -1,53 +1,192 @@
+import os
 import asyncio
+from contextlib import nullcontext
 import httpx
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 from pydantic_ai import Tool
+from pymongo import UpdateOne
 from dotenv import load_dotenv
 from db_utils.db_config import get_collection
-from datetime import datetime, timezone
+from db_utils import hn_posts_db
+from datetime import datetime, timedelta, timezone
 
 load_dotenv()
 
+HN_SEARCH_URL = "https://hn.algolia.com/api/v1/search_by_date"
+HN_HITS_PER_PAGE = 100
+HN_MAX_PAGES = int(os.getenv("HN_MAX_PAGES", "10"))  # caps the first backfill of a company with a long history
+HN_CONCURRENCY = int(os.getenv("HN_CONCURRENCY", "16"))   # companies fetched in parallel
+HN_CACHE_TTL_MINUTES = float(os.getenv("HN_CACHE_TTL_MINUTES", "60"))  # skip companies refreshed this recently
+HN_TIMEOUT = 20
+
 class HNScrapeInput(BaseModel):
     company: str
 
+class HNBatchInput(BaseModel):
+    companies: List[str]
+
+def new_client() -> httpx.AsyncClient:
+    """Pooled client sized for HN_CONCURRENCY; use it with `async with` so its connections are closed."""
+    return httpx.AsyncClient(
+        timeout=HN_TIMEOUT,
+        limits=httpx.Limits(max_connections=HN_CONCURRENCY, max_keepalive_connections=HN_CONCURRENCY)
+    )
+
+def _clean_post(post: dict) -> dict:
+    return {
+        "objectID": post.get("objectID", ""),
+        "author": post.get("author", ""),
+        "url": post.get("url", ""),
+        "created_at": post.get("created_at", ""),
+        "created_at_i": post.get("created_at_i", 0),
+        "num_comments": post.get("num_comments", 0),
+        "title": post.get("title") or post.get("story_title", "")
+    }
+
+async def fetch_new_posts(client: httpx.AsyncClient, company: str, since: int = 0, until: Optional[int] = None):
+    """
+    Stories matching `company` created at or after `since` (and at or before `until`, if given), newest first.
+
+    search_by_date returns newest hits first; each request narrows the upper
+    bound to the oldest hit seen so far, so paging never runs into Algolia's
+    page-depth limit. Returns (posts, complete) where `complete` is False when
+    HN_MAX_PAGES stopped the walk early.
+    """
+    posts, seen, upper = [], set(), until
+    for _ in range(HN_MAX_PAGES):
+        filters = f"created_at_i>={since}" + (f",created_at_i<={upper}" if upper is not None else "")
+        response = await client.get(HN_SEARCH_URL, params={
+            "query": company,
+            "tags": "story",
+            "numericFilters": filters,
+            "hitsPerPage": HN_HITS_PER_PAGE
+        })
+        response.raise_for_status()
+        hits = response.json().get("hits", [])
+
+        new_hits = [hit for hit in hits if hit.get("objectID") and hit["objectID"] not in seen]
+        if not new_hits:
+            return posts, True
+        for hit in new_hits:
+            seen.add(hit["objectID"])
+            posts.append(_clean_post(hit))
+        if len(hits) < HN_HITS_PER_PAGE:
+            return posts, True
+        upper = min(post["created_at_i"] for post in posts)
+    return posts, False
+
+async def fetch_with_backfill(client: httpx.AsyncClient, company: str, hacker_news: dict):
+    """
+    New posts since the company's cursor, plus whatever earlier walks left unfetched.
+
+    A walk stopped by HN_MAX_PAGES leaves a gap between its start and the oldest
+    post it reached; gaps are stored as {"since", "before"} ranges in
+    `hacker_news.backfill` and resumed on later refreshes until they close.
+    Returns (posts, new cursor, remaining gaps).
+    """
+    since = hacker_news.get("last_created_at_i", 0)
+    posts, complete = await fetch_new_posts(client, company, since)
+    cursor = max([since] + [post["created_at_i"] for post in posts])
+    new_gap = None if complete else {"since": since, "before": min(post["created_at_i"] for post in posts)}
+
+    gaps = []
+    for gap in hacker_news.get("backfill") or []:
+        gap_posts, gap_complete = await fetch_new_posts(client, company, gap["since"], gap["before"])
+        posts.extend(gap_posts)
+        if not gap_complete:
+            gaps.append({"since": gap["since"], "before": min(post["created_at_i"] for post in gap_posts)})
+    if new_gap:
+        gaps.append(new_gap)
+        print(f"Stopped after {HN_MAX_PAGES} pages of Hacker News results for {company}; older posts will be backfilled")
+    return posts, cursor, gaps
+
+def _is_fresh(hacker_news: dict) -> bool:
+    scraped_at = hacker_news.get("scraped_at")
+    if not scraped_at or "last_created_at_i" not in hacker_news or hacker_news.get("backfill"):
+        return False
+    age = datetime.now(timezone.utc) - datetime.fromisoformat(scraped_at)
+    return age <= timedelta(minutes=HN_CACHE_TTL_MINUTES)
+
+async def scrape_hn_companies(companies: List[str], client: Optional[httpx.AsyncClient] = None) -> Dict[str, dict]:
+    """
+    Refreshes Hacker News posts for many companies concurrently over one pooled client.
+
+    Companies refreshed within HN_CACHE_TTL_MINUTES are served from the stored
+    state without any request. Without a `client`, one is opened for the batch
+    and closed after it. Returns {company: {"new_posts", "cached"} or {"error"}}.
+    """
+    companies = list(dict.fromkeys(c.strip().lower() for c in companies if c.strip()))
+    collection = get_collection("company", "company_data")
+
+    docs = await asyncio.to_thread(
+        lambda: list(collection.find({"company": {"$in": companies}}, {"company": 1, "hacker_news": 1}))
+    )
+    state = {doc["company"]: doc.get("hacker_news") or {} for doc in docs}
+
+    results: Dict[str, dict] = {}
+    stale = []
+    for company in companies:
+        if _is_fresh(state.get(company, {})):
+            results[company] = {"new_posts": 0, "cached": True}
+        else:
+            stale.append(company)
+
+    semaphore = asyncio.Semaphore(HN_CONCURRENCY)
+    cursor_updates = []
+
+    async def refresh(company):
+        try:
+            async with semaphore:
+                posts, cursor, gaps = await fetch_with_backfill(client, company, state.get(company, {}))
+            new_count = await asyncio.to_thread(hn_posts_db.upsert_posts, company, posts)
+        except Exception as e:
+            results[company] = {"error": str(e)}
+            return
+
+        # Only the cursor (and any unfinished backfill) lives on the company document; posts are in hn_posts.
+        update = {
+            "$set": {
+                "hacker_news.last_created_at_i": cursor,
+                "hacker_news.scraped_at": datetime.now(timezone.utc).isoformat()
+            },
+            "$unset": {"hacker_news.posts": ""}
+        }
+        if gaps:
+            update["$set"]["hacker_news.backfill"] = gaps
+        else:
+            update["$unset"]["hacker_news.backfill"] = ""
+        cursor_updates.append(UpdateOne({"company": company}, update, upsert=True))
+        results[company] = {"new_posts": new_count, "cached": False}
+
+    if stale:
+        async with new_client() if client is None else nullcontext(client) as client:
+            await asyncio.gather(*(refresh(company) for company in stale))
+    if cursor_updates:
+        await asyncio.to_thread(collection.bulk_write, cursor_updates, ordered=False)
+
+    print(f"Hacker News: {len(stale)} refreshed, {len(companies) - len(stale)} served from cache")
+    return {company: results[company] for company in companies}
+
 @Tool
 async def hn_scrape_tool(input: HNScrapeInput) -> str:
     company = input.company.strip().lower()
-    url = f"https://hn.algolia.com/api/v1/search?query={company}&tags=story"
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            result = response.json()
-    except Exception as e:
-        return f"Error fetching data from Hacker News for {company.title()}: {e}"
-
-    posts = result.get("hits", [])
-    clean_posts = [
-        {
-            "id": post.get("objectID", ""),
-            "author": post.get("author", ""),
-            "url": post.get("url", ""),
-            "created_at": post.get("created_at", ""),
-            "num_comments": post.get("num_comments", 0),
-            "title": post.get("title") or post.get("story_title", "")
-        }
-        for post in posts
-    ]
+    result = (await scrape_hn_companies([company]))[company]
+    if "error" in result:
+        return f"Error fetching data from Hacker News for {company.title()}: {result['error']}"
 
-    collection = get_collection("company", "company_data")
-    collection.update_one(
-        {"company": company},
-        {"$set": {
-            "hacker_news": {
-                "posts": clean_posts,
-                "scraped_at": datetime.now(timezone.utc).isoformat()
-            }
-        }},
-        upsert=True
+    total, latest = await asyncio.gather(
+        asyncio.to_thread(hn_posts_db.count_posts, company),
+        asyncio.to_thread(hn_posts_db.get_posts, company, 5)
     )
+    if result["cached"]:
+        summary = f"Hacker News posts for {company.title()} are already up to date ({total} stored)."
+    else:
+        summary = f"Scraped {result['new_posts']} new posts for {company.title()} from Hacker News ({total} stored)."
+    headlines = "\n".join(f"- {post['title']} ({post.get('url') or 'no link'})" for post in latest if post.get("title"))
+    return f"{summary}\nLatest:\n{headlines}" if headlines else summary
 
-    return f"Scraped {len(clean_posts)} posts for {company.title()} from Hacker News."
-
+@Tool
+async def hn_scrape_batch_tool(input: HNBatchInput) -> Dict[str, dict]:
+    """Refresh Hacker News posts for several companies at once."""
+    return await scrape_hn_companies(input.companies)
@@ -0,0 +1,68 @@
+# relevance.py
+# Local TF-IDF relevance scoring, used to drop off-topic transcripts before they reach the LLM.
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+RELEVANCE_THRESHOLD = float(os.getenv("RELEVANCE_THRESHOLD", "0.02"))
+PRODUCT_NAME_WEIGHT = 5  # weight of each product name term in the query
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.-]*[a-z0-9+#]|[a-z0-9]")
+STOPWORDS = set("""
+a about above after again all also am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its itself just like me more most my no nor not now of off on once only
+or other our out over own really right same she so some such than that the their them then there these they
+this those through to too under until up very was we were what when where which while who why will with
+would you your yeah okay gonna going get got know go see one thing things lot
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in STOPWORDS]
+
+
+def _tfidf(counts: Counter, idf: Dict[str, float]) -> Dict[str, float]:
+    total = sum(counts.values()) or 1
+    vector = {term: (n / total) * idf[term] for term, n in counts.items()}
+    norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+    return {term: v / norm for term, v in vector.items()}
+
+
+def score_documents(query: str, documents: List[str], context: str = "") -> List[float]:
+    """Cosine similarity of each document to the query (weighted up) plus optional context, in TF-IDF space."""
+    doc_counts = [Counter(tokenize(doc)) for doc in documents]
+    name_terms = tokenize(query)
+    query_counts = Counter({term: PRODUCT_NAME_WEIGHT * n for term, n in Counter(name_terms).items()})
+    context_counts = Counter(tokenize(context))
+    if context_counts:
+        # Give the context the same total weight as the product name, however long the website text is.
+        scale = PRODUCT_NAME_WEIGHT * max(len(name_terms), 1) / sum(context_counts.values())
+        for term, n in context_counts.items():
+            query_counts[term] += n * scale
+
+    df = Counter()
+    for counts in doc_counts + [query_counts]:
+        df.update(counts.keys())
+    n = len(doc_counts) + 1
+    # Smoothed idf stays positive, so terms found in every transcript (like the product name) still count.
+    idf = {term: math.log((1 + n) / (1 + d)) + 1 for term, d in df.items()}
+
+    query_vector = _tfidf(query_counts, idf)
+    scores = []
+    for counts in doc_counts:
+        vector = _tfidf(counts, idf)
+        scores.append(sum(weight * vector.get(term, 0.0) for term, weight in query_vector.items()))
+    return scores
+
+
+def filter_relevant(query: str, documents: List[str], context: str = "",
+                    threshold: float = RELEVANCE_THRESHOLD) -> Tuple[List[int], List[float]]:
+    """Indexes of documents scoring at least `threshold`, best first, and the scores of all documents."""
+    if not documents:
+        return [], []
+    scores = score_documents(query, documents, context)
+    kept = sorted((i for i, s in enumerate(scores) if s >= threshold), key=lambda i: scores[i], reverse=True)
+    return kept, scores
@@ -0,0 +1,208 @@
+# summarization.py
+import os
+import json
+import asyncio
+import hashlib
+import re
+from typing import Awaitable, Callable, Dict, List, Optional
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _ENCODING = None
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "5000"))
+
+SummarizeFn = Callable[[str], Awaitable[str]]
+PromptFn = Callable[[str], str]
+
+# ----------------------- Tokens & Chunking -----------------------
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when available, otherwise a ~4 characters per token estimate."""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _split_words(text: str, max_tokens: int) -> List[str]:
+    pieces, current, current_tokens = [], [], 0
+    for word in text.split():
+        word_tokens = count_tokens(word + " ")
+        if current and current_tokens + word_tokens > max_tokens:
+            pieces.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(word)
+        current_tokens += word_tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def _split_sentences(text: str, max_tokens: int) -> List[str]:
+    """Packs the sentences of an oversized line into pieces under budget, falling back to words."""
+    pieces, current, current_tokens = [], [], 0
+    for sentence in _SENTENCE_END.split(text):
+        sentence_tokens = count_tokens(sentence + " ")  # include the joining space
+        units = [sentence] if sentence_tokens <= max_tokens else _split_words(sentence, max_tokens)
+        for unit in units:
+            unit_tokens = sentence_tokens if len(units) == 1 else count_tokens(unit + " ")
+            if current and current_tokens + unit_tokens > max_tokens:
+                pieces.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(unit)
+            current_tokens += unit_tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """Packs lines into chunks of at most `max_tokens`.
+
+    Lines that do not fit are split on sentence boundaries, and sentences that
+    still do not fit (e.g. unpunctuated auto captions) on word boundaries.
+    """
+    chunks, current, current_tokens = [], [], 0
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        line_tokens = count_tokens(line + "\n")
+        units = [line] if line_tokens <= max_tokens else _split_sentences(line, max_tokens)
+        for unit in units:
+            unit_tokens = line_tokens if len(units) == 1 else count_tokens(unit + "\n")
+            if current and current_tokens + unit_tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(unit)
+            current_tokens += unit_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+# ----------------------- Cache -----------------------
+
+def content_hash(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    """
+    Summaries keyed by content hash, persisted to a JSON file between runs.
+    Holds at most `max_entries`, evicting the least recently used (the file keeps that order).
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = SUMMARY_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries: Dict[str, str] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable summary cache {path}: {e}")
+            self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def get(self, key: str) -> Optional[str]:
+        summary = self._entries.pop(key, None)
+        if summary is not None:
+            self._entries[key] = summary  # most recently used goes last
+        return summary
+
+    def set(self, key: str, summary: str):
+        self._entries.pop(key, None)
+        self._entries[key] = summary
+        self._evict()
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+# ----------------------- Map-Reduce -----------------------
+
+async def map_reduce_summarize(
+    documents: List[str],
+    map_prompt: PromptFn,
+    reduce_prompt: PromptFn,
+    run: SummarizeFn,
+    cache: Optional[SummaryCache] = None,
+    cache_namespace: str = "",
+    chunk_tokens: int = 3000,
+    reduce_tokens: int = 6000,
+    concurrency: int = 8,
+) -> str:
+    """Summarizes each document (chunked by token budget), then reduces the summaries hierarchically.
+
+    Chunk and document summaries are cached by `cache_namespace` + content hash,
+    so only new or changed text is sent to the model again. Failed calls are skipped.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(prompt: str) -> str:
+        async with semaphore:
+            try:
+                return (await run(prompt)).strip()
+            except Exception as e:
+                print("⚠️ Summarization call failed:", e)
+                return ""
+
+    async def reduce_all(summaries: List[str]) -> str:
+        summaries = [s for s in summaries if s]
+        while len(summaries) > 1:
+            batches = chunk_text("\n\n".join(summaries), reduce_tokens)
+            if len(batches) >= len(summaries):
+                # Each summary already fills a batch on its own; pair them up so the reduce converges.
+                batches = ["\n\n".join(summaries[i:i + 2]) for i in range(0, len(summaries), 2)]
+            reduced = await asyncio.gather(*(call(reduce_prompt(batch)) for batch in batches))
+            # A failed reduce keeps its input summaries instead of dropping them.
+            summaries = [summary or batch for summary, batch in zip(reduced, batches)]
+        return summaries[0] if summaries else ""
+
+    async def summarize_chunk(chunk: str) -> str:
+        key = content_hash(cache_namespace, "chunk", chunk)
+        cached = cache.get(key) if cache else None
+        if cached is not None:
+            return cached
+        summary = await call(map_prompt(chunk))
+        if summary and cache is not None:
+            cache.set(key, summary)
+        return summary
+
+    async def summarize_document(document: str) -> str:
+        key = content_hash(cache_namespace, document)
+        cached = cache.get(key) if cache else None
+        if cached is not None:
+            return cached
+
+        chunks = chunk_text(document, chunk_tokens)
+        partials = await asyncio.gather(*(summarize_chunk(chunk) for chunk in chunks))
+        summary = partials[0] if len(partials) == 1 else await reduce_all(list(partials))
+        # A document missing some chunk summaries is returned but not cached, so the failed chunks are retried.
+        if summary and all(partials) and cache is not None:
+            cache.set(key, summary)
+        return summary
+
+    document_summaries = await asyncio.gather(
+        *(summarize_document(doc) for doc in documents if doc.strip())
+    )
+    if cache is not None:
+        cache.save()
+    return await reduce_all(list(document_summaries))
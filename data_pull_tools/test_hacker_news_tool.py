@@ -0,0 +1,52 @@
+import asyncio
+import re
+
+import httpx
+
+import hacker_news_tool
+
+
+def fake_algolia(posts):
+    """search_by_date over `posts`: newest first, filtered by created_at_i bounds, one page per request."""
+    def handler(request):
+        filters = request.url.params["numericFilters"]
+        since = int(re.search(r"created_at_i>=(\d+)", filters).group(1))
+        upper = re.search(r"created_at_i<=(\d+)", filters)
+        hits = [p for p in posts if p["created_at_i"] >= since and (not upper or p["created_at_i"] <= int(upper.group(1)))]
+        hits.sort(key=lambda p: p["created_at_i"], reverse=True)
+        return httpx.Response(200, json={"hits": hits[:int(request.url.params["hitsPerPage"])]})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_capped_walk_is_backfilled_on_later_refreshes(monkeypatch):
+    monkeypatch.setattr(hacker_news_tool, "HN_HITS_PER_PAGE", 3)
+    monkeypatch.setattr(hacker_news_tool, "HN_MAX_PAGES", 2)
+    posts = [{"objectID": str(t), "title": f"Acme {t}", "created_at_i": t} for t in range(1, 11)]
+
+    async def refresh_until_complete():
+        state, seen, refreshes = {}, set(), 0
+        async with fake_algolia(posts) as client:
+            while True:
+                found, cursor, gaps = await hacker_news_tool.fetch_with_backfill(client, "acme", state)
+                seen.update(post["created_at_i"] for post in found)
+                state, refreshes = {"last_created_at_i": cursor, "backfill": gaps}, refreshes + 1
+                if not gaps:
+                    return seen, state, refreshes
+
+    seen, state, refreshes = asyncio.run(refresh_until_complete())
+    assert seen == set(range(1, 11))
+    assert state["last_created_at_i"] == 10
+    assert refreshes == 3
+
+
+def test_complete_walk_leaves_no_gap(monkeypatch):
+    monkeypatch.setattr(hacker_news_tool, "HN_HITS_PER_PAGE", 5)
+    posts = [{"objectID": str(t), "title": f"Acme {t}", "created_at_i": t} for t in range(1, 4)]
+
+    async def refresh():
+        async with fake_algolia(posts) as client:
+            return await hacker_news_tool.fetch_with_backfill(client, "acme", {"last_created_at_i": 2})
+
+    found, cursor, gaps = asyncio.run(refresh())
+    assert sorted(post["created_at_i"] for post in found) == [2, 3]
+    assert (cursor, gaps) == (3, [])
@@ -0,0 +1,37 @@
+import io
+import json
+
+import pytest
+
+from db_utils.json_stream import JsonStreamReader, iter_json_items
+
+
+def read_value(text, chunk_size):
+    return JsonStreamReader(io.StringIO(text), chunk_size).value()
+
+
+@pytest.mark.parametrize("text", ["15", "1.5", "-0.25e-3", "1E+10", "true", "null", '"1.5"', '{"a": 12.5}'])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3])
+def test_scalar_split_across_reads_is_read_whole(text, chunk_size):
+    assert read_value(text, chunk_size) == json.loads(text)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 1 << 16])
+def test_iter_json_items_yields_array_items(tmp_path, chunk_size):
+    items = [1, 22.5, "x", None, {"k": [1e5, 2]}, [3, 4]]
+    path = tmp_path / "items.json"
+    path.write_text(" " + json.dumps(items, indent=2) + "\n")
+    assert list(iter_json_items(str(path), chunk_size)) == items
+
+
+def test_iter_json_items_yields_a_non_array_value(tmp_path):
+    path = tmp_path / "value.json"
+    path.write_text('{"session_uuid": "s1"}')
+    assert list(iter_json_items(str(path), 2)) == [{"session_uuid": "s1"}]
+
+
+def test_iter_json_items_rejects_a_malformed_array(tmp_path):
+    path = tmp_path / "bad.json"
+    path.write_text("[1 2]")
+    with pytest.raises(ValueError):
+        list(iter_json_items(str(path), 1))
@@ -0,0 +1,20 @@
+from summarization import chunk_text, count_tokens
+
+
+def test_chunks_stay_within_budget():
+    text = "\n".join(f"Line {i} talks about the product. It has a second sentence here." for i in range(200))
+    chunks = chunk_text(text, 60)
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 60 for chunk in chunks)
+    assert " ".join(" ".join(chunks).split()) == " ".join(text.split())
+
+
+def test_oversized_unpunctuated_line_is_split_on_words():
+    text = " ".join(f"word{i}" for i in range(500))
+    chunks = chunk_text(text, 40)
+    assert all(count_tokens(chunk) <= 40 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_blank_text_has_no_chunks():
+    assert chunk_text("\n \n", 100) == []
@@ -0,0 +1,19 @@
+from website_scraper_tool import BoilerplateFilter, WebsiteContent
+
+
+def page(i, *blocks):
+    return WebsiteContent(url=f"https://acme.com/{i}", company_name="Acme", text_content=list(blocks), links=[])
+
+
+def test_blocks_repeated_across_most_pages_are_dropped():
+    pages = [page(i, "Home  About", f"Body of page {i}", "© Acme Inc.") for i in range(4)]
+    pages.append(page(4, "Body of page 4", "home about"))
+    boilerplate = BoilerplateFilter(threshold=0.6, min_pages=3).fit(pages)
+    assert [boilerplate.clean(p).text_content for p in pages[-2:]] == [["Body of page 3"], ["Body of page 4"]]
+    assert boilerplate.bytes_saved > 0
+
+
+def test_small_sites_are_left_alone():
+    pages = [page(i, "Nav", f"Body {i}") for i in range(2)]
+    boilerplate = BoilerplateFilter(min_pages=3).fit(pages)
+    assert boilerplate.clean(pages[0]).text_content == ["Nav", "Body 0"]
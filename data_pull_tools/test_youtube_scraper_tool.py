@@ -0,0 +1,46 @@
+from youtube_scraper_tool import VideoProcessor
+
+
+REPEATED_WORD_VTT = """WEBVTT
+
+00:00:00.000 --> 00:00:01.000
+Did you say no
+
+00:00:01.000 --> 00:00:02.000
+no way it works
+
+00:00:02.000 --> 00:00:03.000
+it works fine
+"""
+
+ROLLING_VTT = """WEBVTT
+
+00:00:00.000 --> 00:00:02.000
+ 
+the new<00:00:00.500><c> model</c>
+
+00:00:02.000 --> 00:00:02.010
+the new model
+ 
+
+00:00:02.010 --> 00:00:04.000
+the new model
+makes<00:00:02.500><c> setup fast</c>
+"""
+
+
+def test_manual_captions_keep_words_repeated_across_cues():
+    assert VideoProcessor.merge_vtt_cues(REPEATED_WORD_VTT) == "Did you say no no way it works it works fine"
+
+
+def test_auto_captions_drop_the_repeated_line():
+    assert VideoProcessor.merge_vtt_cues(ROLLING_VTT, rolling=True) == "the new model makes setup fast"
+
+
+def test_pick_caption_url_reports_auto_captions():
+    manual = {"subtitles": {"en": [{"ext": "vtt", "url": "manual"}]},
+              "automatic_captions": {"en": [{"ext": "vtt", "url": "auto"}]}}
+    auto = {"automatic_captions": {"en-US": [{"ext": "json3", "url": "x"}, {"ext": "vtt", "url": "auto"}]}}
+    assert VideoProcessor.pick_caption_url(manual) == ("manual", False)
+    assert VideoProcessor.pick_caption_url(auto) == ("auto", True)
+    assert VideoProcessor.pick_caption_url({}) == (None, False)
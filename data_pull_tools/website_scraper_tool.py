@@ -3,7 +3,13 @@ import os
 import json
 import time
 import asyncio
-from typing import List
+import atexit
+import hashlib
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from urllib.parse import urlparse, urljoin
 from collections import deque
 from dotenv import load_dotenv
@@ -17,10 +23,26 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from pydantic import BaseModel, HttpUrl
-from pydantic_ai import Tool
+from pydantic_ai import Tool, Agent
+from pydantic_ai.models.openai import OpenAIModel
+from pydantic_ai.providers.openai import OpenAIProvider
+from summarization import SummaryCache, count_tokens, map_reduce_summarize
 
 load_dotenv()
 
+CHECKPOINT_EVERY = 10  # pages between crawl checkpoint saves
+SCRAPER_WORKERS = int(os.getenv("SCRAPER_WORKERS", "4"))  # concurrent crawls / browser sessions
+BOILERPLATE_THRESHOLD = 0.6  # share of pages a text block must appear on to be dropped
+BOILERPLATE_MIN_PAGES = 3
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_MODEL_NAME = "gpt-4o"
+summary_agent = Agent(OpenAIModel(OPENAI_MODEL_NAME, provider=OpenAIProvider(api_key=OPENAI_API_KEY)))
+
+SUMMARY_CHUNK_TOKENS = 3000    # max tokens of page text per map call
+SUMMARY_REDUCE_TOKENS = 6000   # max tokens of summaries per reduce call
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "8"))
+
 # ----------------------- Models -----------------------
 
 class WebsiteContent(BaseModel):
@@ -32,25 +54,26 @@ class WebsiteContent(BaseModel):
 class ScraperInput(BaseModel):
     url: HttpUrl
     max_pages: int = 0  # 0 = no limit
+    resume: bool = True  # continue from an existing crawl checkpoint
 
 class ScraperOutput(BaseModel):
     json_file: str
     summary_file: str
     summary_text: str
+    pages: int = 0
+    boilerplate_bytes_saved: int = 0
+    boilerplate_tokens_saved: int = 0
 
 class SummaryInput(BaseModel):
-    full_text: str
+    pages: List[str]  # cleaned text of each crawled page
+    cache_file: Optional[str] = None  # per-page summary cache, keyed by content hash
 
 class SummaryOutput(BaseModel):
     summary: str
 
 # ----------------------- Summary Tool -----------------------
 
-# @Tool
-def summarize_with_pydantic_ai(input: SummaryInput) -> SummaryOutput:
-    """Summarizes extracted company website content into a paragraph."""
-    content = input.full_text[:12000]
-    prompt = f"""
+PAGE_SUMMARY_PROMPT = """
 You are a company analyst. Summarize the following extracted content from a company's website.
 
 Mention:
@@ -62,11 +85,115 @@ Mention:
 Content:
 {content}
 """
-    return SummaryOutput(summary=prompt)
+
+SITE_SUMMARY_PROMPT = """
+You are a company analyst. The following are summaries of different pages of one company's website.
+Combine them into a single coherent summary without repeating points.
+
+Mention:
+- What the company does
+- Its services or products
+- Its values/vision/mission (if available)
+- Its market focus or target users
+
+Page summaries:
+{content}
+"""
+
+async def _run_summary_agent(prompt: str) -> str:
+    result = await summary_agent.run(prompt)
+    return result.output if hasattr(result, "output") else str(result)
+
+# @Tool
+async def summarize_with_pydantic_ai(input: SummaryInput) -> SummaryOutput:
+    """Summarizes extracted company website content into a paragraph.
+
+    Each page is summarized on its own (chunked to the token budget when large),
+    then the page summaries are reduced into one. Page summaries are cached by
+    content hash, so a re-crawl only re-summarizes pages whose text changed.
+    """
+    summary = await map_reduce_summarize(
+        input.pages,
+        map_prompt=lambda text: PAGE_SUMMARY_PROMPT.format(content=text),
+        reduce_prompt=lambda text: SITE_SUMMARY_PROMPT.format(content=text),
+        run=_run_summary_agent,
+        cache=SummaryCache(input.cache_file),
+        cache_namespace=f"{OPENAI_MODEL_NAME}:website-page",
+        chunk_tokens=SUMMARY_CHUNK_TOKENS,
+        reduce_tokens=SUMMARY_REDUCE_TOKENS,
+        concurrency=SUMMARY_CONCURRENCY,
+    )
+    return SummaryOutput(summary=summary)
+
+# ----------------------- Browser Pool -----------------------
+
+class BrowserPool:
+    """Headless Chrome sessions reused across pages and crawls instead of one browser per page."""
+
+    def __init__(self, max_size: int):
+        self._idle: "queue.LifoQueue[webdriver.Chrome]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._all: List[webdriver.Chrome] = []
+
+    def _new_driver(self) -> webdriver.Chrome:
+        options = Options()
+        options.add_argument("--headless")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        driver = webdriver.Chrome(service=Service(), options=options)
+        with self._lock:
+            self._all.append(driver)
+        return driver
+
+    def _discard(self, driver: webdriver.Chrome):
+        with self._lock:
+            if driver in self._all:
+                self._all.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def lease(self) -> Iterator[webdriver.Chrome]:
+        self._slots.acquire()
+        try:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                driver = self._new_driver()
+            try:
+                yield driver
+            except Exception:
+                # The session may be wedged after a failed page; start fresh next time.
+                self._discard(driver)
+                raise
+            else:
+                self._idle.put(driver)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            drivers, self._all = self._all, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+_scraper_executor = ThreadPoolExecutor(max_workers=SCRAPER_WORKERS, thread_name_prefix="website-scraper")
+_browser_pool = BrowserPool(max_size=SCRAPER_WORKERS)
+atexit.register(_browser_pool.close)
 
 # ----------------------- Scraper -----------------------
 
 class CompanyWebsiteScraper:
+    def __init__(self, browser_pool: Optional[BrowserPool] = None):
+        self.browser_pool = browser_pool or _browser_pool
+
     def normalize_url(self, url: str) -> str:
         parsed = urlparse(url)
         return parsed._replace(query="", fragment="").geturl().rstrip("/")
@@ -77,42 +204,36 @@ class CompanyWebsiteScraper:
         return parts[0] if parts else "unknown"
 
     def _scrape_using_selenium(self, url: str) -> WebsiteContent:
-        options = Options()
-        options.add_argument("--headless")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        driver = webdriver.Chrome(service=Service(), options=options)
-        driver.get(url)
+        with self.browser_pool.lease() as driver:
+            driver.get(url)
 
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
 
-        try:
-            container = driver.find_element(By.TAG_NAME, "main")
-        except:
-            container = driver.find_element(By.TAG_NAME, "body")
-
-        all_elements = container.find_elements(By.XPATH, ".//*")
-        visible_texts = []
-        seen_texts = set()
-
-        for elem in all_elements:
             try:
-                if elem.is_displayed():
-                    if not elem.find_elements(By.XPATH, "./*"):
-                        text = elem.text.strip()
-                        if text and text not in seen_texts:
-                            visible_texts.append(text)
-                            seen_texts.add(text)
+                container = driver.find_element(By.TAG_NAME, "main")
             except:
-                continue
-
-        links = {
-            a.get_attribute('href')
-            for a in driver.find_elements(By.TAG_NAME, 'a')
-            if a.get_attribute('href') and a.get_attribute('href').startswith("http")
-        }
-
-        driver.quit()
+                container = driver.find_element(By.TAG_NAME, "body")
+
+            all_elements = container.find_elements(By.XPATH, ".//*")
+            visible_texts = []
+            seen_texts = set()
+
+            for elem in all_elements:
+                try:
+                    if elem.is_displayed():
+                        if not elem.find_elements(By.XPATH, "./*"):
+                            text = elem.text.strip()
+                            if text and text not in seen_texts:
+                                visible_texts.append(text)
+                                seen_texts.add(text)
+                except:
+                    continue
+
+            links = {
+                a.get_attribute('href')
+                for a in driver.find_elements(By.TAG_NAME, 'a')
+                if a.get_attribute('href') and a.get_attribute('href').startswith("http")
+            }
 
         return WebsiteContent(
             url=url,
@@ -127,65 +248,297 @@ class CompanyWebsiteScraper:
     
 
     def crawl_website(self, base_url: str, max_pages: int = 0) -> List[WebsiteContent]:
+        return list(self.iter_crawl(base_url, max_pages=max_pages))
+
+    def iter_crawl(self, base_url: str, max_pages: int = 0,
+                   checkpoint: Optional["CrawlCheckpoint"] = None) -> Iterator[WebsiteContent]:
+        """Breadth-first crawl that yields each page as soon as it is scraped.
+
+        When a checkpoint is given, the visited set and frontier are taken from it
+        and saved back periodically so an interrupted crawl can be resumed.
+        """
         base_url = self.normalize_url(base_url)
         base_pattern = re.compile(rf"^{re.escape(base_url)}(/.*)?$")
 
-        visited = set()
-        to_visit = deque([base_url])
-        scraped_data = []
+        if checkpoint is None:
+            checkpoint = CrawlCheckpoint(None, base_url)
+        if not checkpoint.frontier and not checkpoint.visited:
+            checkpoint.enqueue(base_url)
 
-        while to_visit:
-            current_url = to_visit.popleft()
+        pages_since_save = 0
+        while checkpoint.frontier:
+            if max_pages > 0 and len(checkpoint.visited) >= max_pages:
+                break
+
+            current_url = checkpoint.frontier.popleft()
             norm_url = self.normalize_url(current_url)
-            if norm_url in visited:
+            if norm_url in checkpoint.visited:
                 continue
 
             try:
                 print(f"Scraping: {current_url}")
                 content = self.extract_website_content(current_url)
-                scraped_data.append(content)
-                visited.add(norm_url)
+            except Exception as e:
+                print(f"Error scraping {current_url}: {e}")
+                continue
+
+            checkpoint.visited.add(norm_url)
+            for link in content.links:
+                full_url = self.normalize_url(
+                    link if urlparse(link).netloc else urljoin(base_url, link)
+                )
+                if base_pattern.match(full_url):
+                    checkpoint.enqueue(full_url)
+
+            yield content
 
-                for link in content.links:
+            pages_since_save += 1
+            if pages_since_save >= CHECKPOINT_EVERY:
+                checkpoint.save()
+                pages_since_save = 0
+
+    def crawl_to_jsonl(self, base_url: str, json_file: str, checkpoint_file: str,
+                       max_pages: int = 0, resume: bool = True) -> int:
+        """Crawls a site, appending every page to `json_file` as it is scraped.
+
+        Returns the total number of pages in `json_file`. A checkpoint is kept in
+        `checkpoint_file` while the crawl runs and removed once it completes.
+        """
+        base_url = self.normalize_url(base_url)
+        checkpoint = CrawlCheckpoint(checkpoint_file, base_url)
+        resuming = resume and checkpoint.load()
+        if resuming:
+            # Pages written after the last checkpoint save are replayed from the output file.
+            base_pattern = re.compile(rf"^{re.escape(base_url)}(/.*)?$")
+            for page in iter_jsonl_pages(json_file):
+                norm_url = self.normalize_url(page.url)
+                if norm_url in checkpoint.visited:
+                    continue
+                checkpoint.visited.add(norm_url)
+                for link in page.links:
                     full_url = self.normalize_url(
                         link if urlparse(link).netloc else urljoin(base_url, link)
                     )
+                    if base_pattern.match(full_url):
+                        checkpoint.enqueue(full_url)
+            print(f"Resuming crawl of {base_url}: {len(checkpoint.visited)} pages done, "
+                  f"{len(checkpoint.frontier)} queued")
+
+        page_count = len(checkpoint.visited)
+        with JsonlPageWriter(json_file, append=resuming) as writer:
+            for content in self.iter_crawl(base_url, max_pages=max_pages, checkpoint=checkpoint):
+                writer.write(content)
+                page_count += 1
+
+        checkpoint.clear()
+        return page_count
+
+# ----------------------- Crawl Storage -----------------------
+
+class CrawlCheckpoint:
+    """Visited set and frontier of a crawl, persisted as JSON so it can be resumed."""
+
+    def __init__(self, path: Optional[str], base_url: str):
+        self.path = path
+        self.base_url = base_url
+        self.visited: Set[str] = set()
+        self.frontier: Deque[str] = deque()
+        self._queued: Set[str] = set()
+
+    def enqueue(self, url: str):
+        if url not in self.visited and url not in self._queued:
+            self._queued.add(url)
+            self.frontier.append(url)
+
+    def load(self) -> bool:
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            return False
+        if state.get("base_url") != self.base_url:
+            return False
+
+        self.visited = set(state.get("visited", []))
+        self.frontier = deque()
+        self._queued = set()
+        for url in state.get("frontier", []):
+            self.enqueue(url)
+        return True
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "base_url": self.base_url,
+                "visited": sorted(self.visited),
+                "frontier": list(self.frontier)
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class JsonlPageWriter:
+    """Append-only JSON Lines writer that flushes every page to disk as it arrives."""
+
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        if append:
+            self._drop_partial_line(path)
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+
+    @staticmethod
+    def _drop_partial_line(path: str):
+        # A crash mid-write can leave a truncated last record behind.
+        if not os.path.exists(path):
+            return
+        with open(path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            pos = size - 1
+            while pos > 0:
+                f.seek(pos - 1)
+                if f.read(1) == b"\n":
+                    break
+                pos -= 1
+            f.truncate(pos)
 
-                    if full_url not in visited and base_pattern.match(full_url):
-                        to_visit.append(full_url)
+    def write(self, page: WebsiteContent):
+        self._file.write(page.model_dump_json() + "\n")
+        self._file.flush()
 
-                if max_pages > 0 and len(visited) >= max_pages:
-                    break
+    def close(self):
+        self._file.close()
 
-            except Exception as e:
-                print(f"Error scraping {current_url}: {e}")
-                continue
+    def __enter__(self):
+        return self
 
-        return scraped_data
+    def __exit__(self, *exc):
+        self.close()
 
 
-    def save_all_to_json(self, data_list: List[WebsiteContent], path: str = "full_scrape_output.json"):
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump([json.loads(d.model_dump_json()) for d in data_list], f, ensure_ascii=False, indent=4)
+def iter_jsonl_pages(path: str) -> Iterator[WebsiteContent]:
+    """Streams pages back from a crawl output file, skipping unreadable lines."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield WebsiteContent.model_validate_json(line)
+            except ValueError:
+                continue
+
+# ----------------------- Boilerplate -----------------------
+
+class BoilerplateFilter:
+    """Drops text blocks that repeat across most pages of a site (navigation, footers, cookie banners).
+
+    Blocks are normalised and hashed; a block is boilerplate when it appears on at
+    least `threshold` of the site's pages. Sites smaller than `min_pages` are left alone.
+    """
+
+    def __init__(self, threshold: float = BOILERPLATE_THRESHOLD, min_pages: int = BOILERPLATE_MIN_PAGES):
+        self.threshold = threshold
+        self.min_pages = min_pages
+        self.page_count = 0
+        self._block_pages: Dict[bytes, int] = {}
+        self.bytes_saved = 0
+        self.tokens_saved = 0
+
+    @staticmethod
+    def _block_key(block: str) -> bytes:
+        normalized = " ".join(block.lower().split())
+        return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest()
+
+    def fit(self, pages: Iterable[WebsiteContent]) -> "BoilerplateFilter":
+        for page in pages:
+            self.page_count += 1
+            for key in {self._block_key(block) for block in page.text_content}:
+                self._block_pages[key] = self._block_pages.get(key, 0) + 1
+        return self
+
+    def is_boilerplate(self, block: str) -> bool:
+        if self.page_count < self.min_pages:
+            return False
+        return self._block_pages.get(self._block_key(block), 0) >= self.threshold * self.page_count
+
+    def clean(self, page: WebsiteContent) -> WebsiteContent:
+        kept = []
+        for block in page.text_content:
+            if self.is_boilerplate(block):
+                self.bytes_saved += len(block.encode("utf-8"))
+                self.tokens_saved += count_tokens(block)
+            else:
+                kept.append(block)
+        return page.model_copy(update={"text_content": kept})
 
 # ----------------------- Main Logic -----------------------
 
+def _crawl_and_clean_pages(scraper: CompanyWebsiteScraper, input_data: ScraperInput, raw_file: str,
+                           json_file: str, checkpoint_file: str) -> Tuple[List[str], BoilerplateFilter]:
+    scraper.crawl_to_jsonl(
+        str(input_data.url), raw_file, checkpoint_file,
+        max_pages=input_data.max_pages, resume=input_data.resume
+    )
+
+    # Site-wide block counts need the whole crawl, so strip boilerplate in a second streaming pass.
+    boilerplate = BoilerplateFilter().fit(iter_jsonl_pages(raw_file))
+    pages = []
+    with JsonlPageWriter(json_file) as writer:
+        for page in iter_jsonl_pages(raw_file):
+            cleaned = boilerplate.clean(page)
+            writer.write(cleaned)
+            pages.append("\n".join(cleaned.text_content))
+    return pages, boilerplate
+
+
 async def run_scraper_tool_logic(input_data: ScraperInput) -> ScraperOutput:
     scraper = CompanyWebsiteScraper()
-    results = scraper.crawl_website(str(input_data.url), max_pages=input_data.max_pages)
-    scraper.save_all_to_json(results, "full_scrape_output.json")
+    company = scraper._extract_domain_as_company(str(input_data.url))
+    raw_file = f"{company}_crawl_pages.jsonl"
+    json_file = f"{company}_scrape_output.jsonl"
+    checkpoint_file = f"{company}_crawl_checkpoint.json"
+    summary_file = f"{company}_summary.json"
+    summary_cache_file = f"{company}_page_summaries.json"
+
+    # The crawl is blocking Selenium work; run it on the shared scraper pool so
+    # several companies can be crawled while the event loop stays free.
+    loop = asyncio.get_running_loop()
+    pages, boilerplate = await loop.run_in_executor(
+        _scraper_executor, _crawl_and_clean_pages, scraper, input_data, raw_file, json_file, checkpoint_file
+    )
+    print(f"Boilerplate removed for {company}: {boilerplate.bytes_saved} bytes, "
+          f"~{boilerplate.tokens_saved} tokens across {boilerplate.page_count} pages")
 
-    combined_text = "\n".join(" ".join(r.text_content) for r in results)
-    summary_result = summarize_with_pydantic_ai(SummaryInput(full_text=combined_text))
+    summary_result = await summarize_with_pydantic_ai(SummaryInput(pages=pages, cache_file=summary_cache_file))
     summary = summary_result.summary
 
-    with open("summary.json", "w", encoding="utf-8") as f:
+    with open(summary_file, "w", encoding="utf-8") as f:
         json.dump({"summary": summary}, f, ensure_ascii=False, indent=4)
 
     return ScraperOutput(
-        json_file="full_scrape_output.json",
-        summary_file="summary.json",
-        summary_text=summary
+        json_file=json_file,
+        summary_file=summary_file,
+        summary_text=summary,
+        pages=boilerplate.page_count,
+        boilerplate_bytes_saved=boilerplate.bytes_saved,
+        boilerplate_tokens_saved=boilerplate.tokens_saved
     )
 
 # ----------------------- Tool Wrapper -----------------------
@@ -193,7 +546,7 @@ async def run_scraper_tool_logic(input_data: ScraperInput) -> ScraperOutput:
 @Tool
 async def scrape_company_website(input_data: ScraperInput) -> ScraperOutput:
     """Scrapes full content of a website and summarizes it without DB dependencies."""
-    return await asyncio.to_thread(lambda: asyncio.run(run_scraper_tool_logic(input_data)))
+    return await run_scraper_tool_logic(input_data)
 
 # ----------------------- Test Usage -----------------------
 
@@ -1,20 +1,27 @@
 import os
 import re
+import html
 import json
 import asyncio
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
 from pydantic import BaseModel
 from pydantic_ai import Tool, Agent
 from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai.providers.openai import OpenAIProvider
 from youtubesearchpython import VideosSearch
 import yt_dlp
+import httpx
 from huggingface_hub import InferenceClient
 from dotenv import load_dotenv
 from datetime import datetime, timezone
 
 # ✅ MongoDB helper import
 from db_utils.db_config import get_collection
+from db_utils import transcript_db, youtube_search_db
+from summarization import SummaryCache, count_tokens, map_reduce_summarize
+from relevance import filter_relevant
 
 # Load environment variables
 load_dotenv()
@@ -22,53 +29,107 @@ load_dotenv()
 HF_TOKEN = os.getenv("HF_TOKEN")
 HF_MODEL = "meta-llama/Llama-2-7b-chat-hf"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_MODEL = OpenAIModel("gpt-4o", provider=OpenAIProvider(api_key=OPENAI_API_KEY))
+OPENAI_MODEL_NAME = "gpt-4o"
+OPENAI_MODEL = OpenAIModel(OPENAI_MODEL_NAME, provider=OpenAIProvider(api_key=OPENAI_API_KEY))
 agent = Agent(OPENAI_MODEL)
 
-CHUNK_SIZE = 3000
+SUMMARY_CHUNK_TOKENS = 1500    # max tokens of transcript per map call
+SUMMARY_REDUCE_TOKENS = 6000   # max tokens of summaries per reduce call
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "8"))
+SUMMARY_CACHE_FILE = os.getenv("YOUTUBE_SUMMARY_CACHE", "youtube_summary_cache.json")
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("YOUTUBE_SUMMARY_CACHE_MAX_ENTRIES", "5000"))  # least recently used evicted
+YTDLP_WORKERS = int(os.getenv("YTDLP_WORKERS", "8"))       # videos fetched in parallel
+VIDEO_TIMEOUT = float(os.getenv("VIDEO_TIMEOUT", "120"))   # seconds allowed per video
+SOCKET_TIMEOUT = 30
+HF_CLEANUP = os.getenv("HF_CLEANUP", "0") == "1"  # extra LLM pass after the local caption merge
+CAPTION_FILLERS = {"uh", "um"}
+
+_ytdlp_executor = ThreadPoolExecutor(max_workers=YTDLP_WORKERS, thread_name_prefix="yt-dlp")
+# Shared keep-alive connections for caption downloads from the worker threads.
+_http_client = httpx.Client(
+    timeout=SOCKET_TIMEOUT,
+    follow_redirects=True,
+    limits=httpx.Limits(max_connections=YTDLP_WORKERS, max_keepalive_connections=YTDLP_WORKERS)
+)
 
 class ProductInput(BaseModel):
     product_name: str
+    website_text: Optional[str] = None  # extra context for relevance scoring, e.g. the website summary
 
-class YTDLogger:
-    def __init__(self, log_file): self.log_file = log_file
-    def debug(self, msg): self._write(msg)
-    def warning(self, msg): self._write(msg)
-    def error(self, msg): self._write(msg)
-    def _write(self, msg): open(self.log_file, 'a', encoding='utf-8').write(msg + '\n')
+class ProductBatchInput(BaseModel):
+    product_names: List[str]
+    website_texts: Dict[str, str] = {}  # product name -> website text
 
 class VideoProcessor:
-    def __init__(self, hf_token, hf_model):
+    def __init__(self, hf_token, hf_model, executor=None):
         self.client = InferenceClient(model=hf_model, token=hf_token)
+        self.executor = executor or _ytdlp_executor
 
     @staticmethod
     def sanitize(name): return re.sub(r'[\\/*?:"<>|]', "", name).strip()
 
     @staticmethod
-    def extract_text_from_vtt(vtt):
-        lines = vtt.splitlines()
-        return '\n'.join(
-            re.sub(r'<[^>]+>', '', line).strip()
-            for line in lines
-            if line.strip() and '-->' not in line and not line.startswith(('WEBVTT', 'Kind:', 'Language:')) and '[Music]' not in line
-        )
+    def _vtt_seconds(timestamp):
+        seconds = 0.0
+        for part in timestamp.strip().split(':'):
+            seconds = seconds * 60 + float(part)
+        return seconds
 
     @staticmethod
-    def remove_redundancy(text):
-        lines = text.splitlines()
-        seen = set()
-        cleaned_lines = []
-        previous_line = ""
-
-        for line in lines:
-            line = line.strip()
-            if not line or line.lower() in {"uh", "um", "you know"}:
+    def parse_vtt_cues(vtt):
+        """(start, end, text) per cue, with inline tags, entities and [Music]-style markers stripped."""
+        vtt = html.unescape(re.sub(r'<[^>]*>', '', vtt.replace('\r\n', '\n')))
+        vtt = re.sub(r'\[[^\]\n]*\]', ' ', vtt)
+        cues = []
+        to_seconds = VideoProcessor._vtt_seconds
+        for block in vtt.split('\n\n'):
+            lines = block.strip('\n').split('\n')
+            # The timing line comes first, or second after an optional cue identifier.
+            timing = 0 if '-->' in lines[0] else 1
+            if timing >= len(lines) or '-->' not in lines[timing]:
                 continue
-            if line != previous_line and line not in seen:
-                cleaned_lines.append(line)
-                seen.add(line)
-            previous_line = line
-        return '\n'.join(cleaned_lines)
+            text = ' '.join(' '.join(lines[timing + 1:]).split())
+            if text:
+                start, _, rest = lines[timing].partition('-->')
+                end = rest.split(None, 1)[0] if rest.strip() else start
+                cues.append((to_seconds(start), to_seconds(end), text))
+        return cues
+
+    @staticmethod
+    def merge_vtt_cues(vtt, pause=2.0, max_overlap=64, rolling=False):
+        """Joins caption cues into plain text, starting a new line whenever the speaker pauses
+        for more than `pause` seconds.
+
+        With `rolling` (YouTube auto captions), every cue repeats the previous line, so only each
+        cue's new suffix is kept: the longest word overlap between the running text's tail and
+        the cue's head is dropped. Other captions are kept word for word, so speech that really
+        repeats across a cue boundary ("did you say no" / "no way") is not lost.
+        """
+        words, keys = [], []
+        lines, line_start, last_end = [], 0, None
+        for start, end, text in VideoProcessor.parse_vtt_cues(vtt):
+            if last_end is not None and start - last_end > pause and len(words) > line_start:
+                lines.append(words[line_start:])
+                line_start = len(words)
+            last_end = end if last_end is None else max(last_end, end)
+
+            cue_words = text.split()
+            cue_keys = text.lower().split()
+            first = cue_keys[0]
+            overlap = 0
+            for k in range(min(len(cue_keys), len(keys), max_overlap) if rolling else 0, 0, -1):
+                if keys[-k] == first and keys[-k:] == cue_keys[:k]:
+                    overlap = k
+                    break
+            words.extend(cue_words[overlap:])
+            keys.extend(cue_keys[overlap:])
+        if len(words) > line_start:
+            lines.append(words[line_start:])
+
+        return '\n'.join(
+            ' '.join(w for w in line if w.lower() not in CAPTION_FILLERS)
+            for line in lines
+        )
 
     def clean_text(self, raw_text):
         prompt = (
@@ -90,118 +151,165 @@ class VideoProcessor:
             return raw_text
 
     def get_video_urls(self, query, max_results=10):
+        cached = youtube_search_db.get_results(query, max_results)
+        if cached is not None:
+            return cached
         results = VideosSearch(f"{query} demo OR review", limit=max_results).result()['result']
-        return [r['link'] for r in results]
-
-    async def download_and_clean(self, video_url, output_dir):
-        os.makedirs(output_dir, exist_ok=True)
-        try:
-            with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-                info = ydl.extract_info(video_url, download=False)
-                title = self.sanitize(info.get('title', 'video'))
-                base_path = os.path.join(output_dir, title)
-                vtt_file = f"{base_path}.en.vtt"
-                json_file = f"{base_path}.json"
-                log_file = f"{base_path}.log"
-
-            if os.path.exists(json_file):
-                return
-
-            ydl_opts = {
-                'quiet': True,
-                'writesubtitles': True,
-                'writeautomaticsub': True,
-                'skip_download': True,
-                'subtitleslangs': ['en'],
-                'subtitlesformat': 'vtt',
-                'outtmpl': base_path + '.%(ext)s',
-                'logger': YTDLogger(log_file)
-            }
+        urls = [r['link'] for r in results]
+        youtube_search_db.save_results(query, max_results, urls)
+        return urls
 
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([video_url])
-
-            if os.path.exists(vtt_file):
-                with open(vtt_file, 'r', encoding='utf-8') as f:
-                    raw = f.read()
-                loop = asyncio.get_running_loop()
-                raw_text = self.extract_text_from_vtt(raw)
-                precleaned = self.remove_redundancy(raw_text)
-                cleaned = await loop.run_in_executor(None, self.clean_text, precleaned)
-            else:
-                cleaned = ""
-
-            with open(json_file, 'w', encoding='utf-8') as jf:
-                json.dump({
-                    "video_title": title,
-                    "video_url": video_url,
-                    "transcript": cleaned
-                }, jf, indent=2, ensure_ascii=False)
-
-            for f in [vtt_file, log_file]:
-                if os.path.exists(f):
-                    os.remove(f)
+    @staticmethod
+    def pick_caption_url(info):
+        """
+        (English VTT caption URL, whether it is an auto caption track) from a yt-dlp info dict,
+        preferring manual subtitles over auto captions; (None, False) when there is none.
+        """
+        for auto, tracks in ((False, info.get('subtitles') or {}), (True, info.get('automatic_captions') or {})):
+            langs = ['en'] + sorted(lang for lang in tracks if lang.startswith('en') and lang != 'en')
+            for lang in langs:
+                for fmt in tracks.get(lang) or []:
+                    if fmt.get('ext') == 'vtt' and fmt.get('url'):
+                        return fmt['url'], auto
+        return None, False
 
+    @staticmethod
+    def video_id(video_url):
+        """YouTube video id from a watch, youtu.be or shorts URL."""
+        parsed = urlparse(video_url)
+        if parsed.hostname and parsed.hostname.endswith("youtu.be"):
+            return parsed.path.lstrip("/").split("/")[0] or None
+        query_id = parse_qs(parsed.query).get("v")
+        if query_id:
+            return query_id[0]
+        parts = [p for p in parsed.path.split("/") if p]
+        if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live"):
+            return parts[1]
+        return None
+
+    def _fetch_captions(self, video_url):
+        """Blocking work for one video; returns (title, raw_vtt, whether the captions are auto-generated)."""
+        with yt_dlp.YoutubeDL({'quiet': True, 'skip_download': True, 'socket_timeout': SOCKET_TIMEOUT}) as ydl:
+            info = ydl.extract_info(video_url, download=False)
+        title = info.get('title', 'video')
+
+        raw = None
+        caption_url, auto = self.pick_caption_url(info)
+        if caption_url:
+            response = _http_client.get(caption_url)
+            response.raise_for_status()
+            raw = response.text
+        return title, raw, auto
+
+    async def download_and_clean(self, video_url, product_name):
+        """Makes sure a fresh transcript for the video is in the store; returns its video id."""
+        video_id = self.video_id(video_url)
+        if not video_id:
+            print(f"Skipping unrecognised video URL: {video_url}")
+            return None
+
+        loop = asyncio.get_running_loop()
+        try:
+            stored = await loop.run_in_executor(self.executor, transcript_db.get_transcript, video_id)
+            if stored is not None:
+                await loop.run_in_executor(self.executor, transcript_db.add_product, video_id, product_name)
+                return video_id
+
+            # yt-dlp is blocking; run it on the bounded worker pool so videos download concurrently.
+            title, raw, auto = await asyncio.wait_for(
+                loop.run_in_executor(self.executor, self._fetch_captions, video_url),
+                timeout=VIDEO_TIMEOUT
+            )
+
+            cleaned = self.merge_vtt_cues(raw, rolling=auto) if raw is not None else ""
+            if cleaned and HF_CLEANUP:
+                cleaned = await loop.run_in_executor(self.executor, self.clean_text, cleaned)
+
+            await loop.run_in_executor(
+                self.executor, transcript_db.save_transcript,
+                video_id, video_url, title, raw, cleaned, product_name
+            )
+            return video_id
+
+        except asyncio.TimeoutError:
+            print(f"Download timed out after {VIDEO_TIMEOUT}s: {video_url}")
         except Exception as e:
             print(f"Download failed: {e}")
+        return None
+
+TRANSCRIPT_CHUNK_PROMPT = (
+    "Summarize this transcript chunk focusing only on the product '{product}', "
+    "including its features, benefits, and capabilities. Ignore comparisons and unrelated content.\n\n"
+    "{content}"
+)
 
-async def summarize_product_from_folder(product_name: str, transcript_dir: str):
+PRODUCT_SUMMARY_PROMPT = (
+    "Here are summarized chunks about '{product}'. Now, synthesize them into a single coherent summary "
+    "focusing only on the product’s features, use-cases, and benefits:\n\n"
+    "{content}"
+)
+
+# Shared by every product summarized in this process, so concurrent runs don't overwrite each other's cache file.
+_summary_cache = SummaryCache(SUMMARY_CACHE_FILE, max_entries=SUMMARY_CACHE_MAX_ENTRIES)
+
+
+async def _run_agent(prompt: str) -> str:
+    result = await agent.run(prompt)
+    return result.output if hasattr(result, "output") else str(result)
+
+
+async def summarize_product(product_name: str, video_ids: List[str], website_text: str = ""):
     print(f"\U0001f9e0 Summarizing: {product_name}")
     all_texts = []
     video_objects = []
 
-    for f in os.listdir(transcript_dir):
-        if f.endswith(".json") and f != "combined_summary.json":
-            with open(os.path.join(transcript_dir, f), 'r', encoding='utf-8') as fp:
-                data = json.load(fp)
-                if "transcript" in data:
-                    all_texts.append(data["transcript"].strip())
-                    video_objects.append({
-                        "video_title": data.get("video_title", ""),
-                        "video_url": data.get("video_url", ""),
-                        "transcript": data.get("transcript", "")
-                    })
+    for data in transcript_db.get_transcripts(video_ids):
+        transcript = (data.get("transcript") or "").strip()
+        if transcript:
+            all_texts.append(transcript)
+            video_objects.append({
+                "video_id": data["video_id"],
+                "video_title": data.get("video_title", ""),
+                "video_url": data.get("video_url", "")
+            })
 
     if not all_texts:
         return {"summary": "No usable transcripts."}
 
-    combined_text = "\n\n".join(all_texts)
-    chunks = [combined_text[i:i + CHUNK_SIZE] for i in range(0, len(combined_text), CHUNK_SIZE)]
-
-    partial_summaries = []
-    for i, chunk in enumerate(chunks):
-        prompt = (
-            f"Chunk {i+1}:\n"
-            f"Summarize this transcript chunk focusing only on the product '{product_name}', "
-            "including its features, benefits, and capabilities. Ignore comparisons and unrelated content.\n\n"
-            f"{chunk}"
-        )
-        try:
-            result = await agent.run(prompt)
-            summary = result.output if hasattr(result, "output") else str(result)
-            partial_summaries.append(summary)
-        except Exception as e:
-            print(f"⚠️ Error summarizing chunk {i+1}:", e)
+    # Drop off-topic videos before any tokens are spent on them.
+    kept, scores = filter_relevant(product_name, all_texts, context=website_text)
+    for video, score in zip(video_objects, scores):
+        video["relevance"] = round(score, 4)
+    kept_set = set(kept)
+    skipped_tokens = sum(count_tokens(text) for i, text in enumerate(all_texts) if i not in kept_set)
+    print(f"🎯 Relevance: kept {len(kept)}/{len(all_texts)} transcripts, skipped ~{skipped_tokens} tokens")
+    relevance = {
+        "transcripts_used": len(kept),
+        "transcripts_skipped": len(all_texts) - len(kept),
+        "skipped_tokens": skipped_tokens
+    }
+    all_texts = [all_texts[i] for i in kept]
+    video_objects = [video_objects[i] for i in kept]
 
-    combined_summary_text = "\n\n".join(partial_summaries)
-    final_prompt = (
-        f"Here are summarized chunks about '{product_name}'. Now, synthesize them into a single coherent summary "
-        "focusing only on the product’s features, use-cases, and benefits:\n\n"
-        f"{combined_summary_text}"
+    if not all_texts:
+        return {"summary": "No relevant transcripts.", **relevance}
+
+    # Each transcript is chunked on its own, so chunk (and cache) boundaries stay stable when videos are added.
+    final_summary = await map_reduce_summarize(
+        all_texts,
+        map_prompt=lambda text: TRANSCRIPT_CHUNK_PROMPT.format(product=product_name, content=text),
+        reduce_prompt=lambda text: PRODUCT_SUMMARY_PROMPT.format(product=product_name, content=text),
+        run=_run_agent,
+        cache=_summary_cache,
+        cache_namespace=f"{OPENAI_MODEL_NAME}:youtube:{product_name.strip().lower()}",
+        chunk_tokens=SUMMARY_CHUNK_TOKENS,
+        reduce_tokens=SUMMARY_REDUCE_TOKENS,
+        concurrency=SUMMARY_CONCURRENCY,
     )
-    try:
-        final_result = await agent.run(final_prompt)
-        final_summary = final_result.output if hasattr(final_result, "output") else str(final_result)
-    except Exception as e:
-        print("⚠️ Final summarization failed:", e)
-        final_summary = combined_summary_text
-
-    output_path = os.path.join(transcript_dir, "combined_summary.json")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump({
-            "product_name": product_name,
-            "summary": final_summary
-        }, f, indent=2, ensure_ascii=False)
+    if not final_summary:
+        # Nothing to fall back on: every model call failed. Don't store it, so the next run retries.
+        print("⚠️ Final summarization failed")
+        return {"summary": "Summary unavailable: summarization failed.", **relevance}
 
     # ✅ Save to MongoDB
     collection = get_collection("company", "company_data")
@@ -214,6 +322,7 @@ async def summarize_product_from_folder(product_name: str, transcript_dir: str):
             f"youtube.{product_key}": {
                 "videos": video_objects,
                 "summary": final_summary,
+                "relevance": relevance,
                 "scraped_at": datetime.now(timezone.utc).isoformat()
             }
         }},
@@ -221,19 +330,66 @@ async def summarize_product_from_folder(product_name: str, transcript_dir: str):
     )
 
     print(f"✅ Saved summary to MongoDB under youtube.{product_key}")
-    return {"summary": final_summary}
-
-async def _generate_product_summary_internal(product_name: str):
+    return {"summary": final_summary, **relevance}
+
+async def collect_product_videos(processor: VideoProcessor, product_names: List[str]) -> Dict[str, List[str]]:
+    """Searches every product, then fetches each distinct video once for the whole batch; returns video ids per product."""
+    loop = asyncio.get_running_loop()
+    searches = await asyncio.gather(*(
+        loop.run_in_executor(processor.executor, processor.get_video_urls, name, 10) for name in product_names
+    ), return_exceptions=True)
+    for i, (name, urls) in enumerate(zip(product_names, searches)):
+        if isinstance(urls, Exception):
+            # One failed search only leaves that product without videos.
+            print(f"⚠️ Video search failed for {name}: {urls}")
+            searches[i] = []
+
+    products_by_url: Dict[str, List[str]] = {}
+    for name, urls in zip(product_names, searches):
+        for url in urls:
+            products_by_url.setdefault(url, [])
+            if name not in products_by_url[url]:
+                products_by_url[url].append(name)
+    print(f"🔎 {sum(len(urls) for urls in searches)} search results, {len(products_by_url)} distinct videos")
+
+    async def fetch(url, names):
+        video_id = await processor.download_and_clean(url, names[0])
+        if video_id:
+            for name in names[1:]:
+                await loop.run_in_executor(processor.executor, transcript_db.add_product, video_id, name)
+        return video_id
+
+    video_ids = await asyncio.gather(*(fetch(url, names) for url, names in products_by_url.items()))
+    video_ids_by_url = dict(zip(products_by_url, video_ids))
+
+    return {
+        name: list(dict.fromkeys(video_ids_by_url[url] for url in urls if video_ids_by_url.get(url)))
+        for name, urls in zip(product_names, searches)
+    }
+
+async def _generate_product_summaries_internal(product_names: List[str], website_texts: Optional[Dict[str, str]] = None):
+    product_names = list(dict.fromkeys(product_names))
+    website_texts = website_texts or {}
     processor = VideoProcessor(HF_TOKEN, HF_MODEL)
-    base_dir = f"{VideoProcessor.sanitize(product_name)}_captions"
-    os.makedirs(base_dir, exist_ok=True)
-
-    urls = processor.get_video_urls(product_name, max_results=10)
-    await asyncio.gather(*(processor.download_and_clean(url, base_dir) for url in urls))
-
-    return await summarize_product_from_folder(product_name, base_dir)
+    video_ids = await collect_product_videos(processor, product_names)
+    summaries = await asyncio.gather(*(
+        summarize_product(name, video_ids[name], website_texts.get(name, "")) for name in product_names
+    ), return_exceptions=True)
+    return {
+        name: {"error": str(summary)} if isinstance(summary, Exception) else summary
+        for name, summary in zip(product_names, summaries)
+    }
+
+async def _generate_product_summary_internal(product_name: str, website_text: Optional[str] = None):
+    results = await _generate_product_summaries_internal([product_name], {product_name: website_text or ""})
+    return results[product_name]
 
 @Tool
 async def generate_product_summary(input: ProductInput):
     """Search YouTube for product demo/review videos, extract transcripts, and summarize key insights."""
-    return await _generate_product_summary_internal(input.product_name)
+    return await _generate_product_summary_internal(input.product_name, input.website_text)
+
+@Tool
+async def generate_product_summaries(input: ProductBatchInput):
+    """Summarize YouTube demo/review videos for several products at once, fetching videos they share only once."""
+    return await _generate_product_summaries_internal(input.product_names, input.website_texts)
@@ -0,0 +1,172 @@
+# mongo_registry.py
+# Process-wide MongoDB clients: one pooled client per URI, shared by every module that needs a
+# collection, with pool metrics and a single close at shutdown.
+# data_pull_tools/ and supervisor/ run from their own directories and add the repository root to the import path to reach it.
+import os
+import atexit
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import certifi
+from dotenv import load_dotenv
+from pymongo import MongoClient, monitoring
+
+load_dotenv()
+
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_MS = int(os.getenv("MONGO_MAX_IDLE_MS", "300000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "60000"))
+
+
+def _default_compressors() -> str:
+    # zstd needs the optional zstandard package; zlib is always available.
+    try:
+        import zstandard  # noqa: F401
+        return "zstd,zlib"
+    except ImportError:
+        return "zlib"
+
+
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS") or _default_compressors()
+
+_lock = threading.Lock()
+_clients: Dict[str, MongoClient] = {}
+_metrics: Dict[str, "PoolMetrics"] = {}
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool counters for one client, updated from pymongo's pool events.
+
+    Checkout time is pymongo's check-out duration: waiting for a free connection plus, when the pool
+    has no idle one, opening a new connection (handshake and authentication included).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.created = 0
+        self.closed = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_seconds = 0.0
+        self.max_in_use = 0
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "open": self.open,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "created": self.created,
+                "closed": self.closed,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_checkout_ms": round(1000 * self.checkout_seconds / self.checkouts, 3)
+                if self.checkouts else 0.0,
+            }
+
+    def connection_created(self, event):
+        with self._lock:
+            self.created += 1
+            self.open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.closed += 1
+            self.open -= 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            self.checkout_seconds += getattr(event, "duration", 0.0) or 0.0
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+
+
+def _needs_tls(uri: str) -> bool:
+    lowered = uri.lower()
+    return lowered.startswith("mongodb+srv://") or "tls=true" in lowered or "ssl=true" in lowered
+
+
+def _redact(uri: str) -> str:
+    """URI without credentials, used to label metrics."""
+    parts = urlsplit(uri)
+    return f"{parts.scheme}://{parts.netloc.rsplit('@', 1)[-1]}{parts.path}"
+
+
+def get_client(uri: Optional[str] = None) -> MongoClient:
+    """
+    The shared client for `uri`, created with the tuned pool settings on first use.
+    Without a URI, MONGO_URI is used, then a local server (pymongo's own default).
+    """
+    uri = uri or os.getenv("MONGO_URI") or "mongodb://localhost:27017"
+    client = _clients.get(uri)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(uri)
+        if client is None:
+            metrics = PoolMetrics()
+            options = {"tlsCAFile": certifi.where()} if _needs_tls(uri) else {}
+            client = MongoClient(
+                uri,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGO_MAX_IDLE_MS,
+                waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                compressors=MONGO_COMPRESSORS,
+                retryWrites=True,
+                event_listeners=[metrics],
+                **options
+            )
+            _clients[uri] = client
+            _metrics[uri] = metrics
+    return client
+
+
+def get_collection(db_name: str, collection_name: str, uri: Optional[str] = None):
+    return get_client(uri)[db_name][collection_name]
+
+
+def pool_metrics() -> Dict[str, Dict]:
+    """Pool counters per client, keyed by URI without credentials."""
+    with _lock:
+        return {_redact(uri): metrics.snapshot() for uri, metrics in _metrics.items()}
+
+
+def close_all():
+    """Closes every client; safe to call more than once (it also runs at interpreter exit)."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+        _metrics.clear()
+    for client in clients:
+        client.close()
+
+
+atexit.register(close_all)
@@ -1,6 +1,11 @@
+import os
+import time
+import atexit
+import threading
+from contextlib import contextmanager
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
-from typing import List, Optional
+from typing import Iterator, List, Optional, Set, Tuple
 from pydantic import BaseModel, HttpUrl
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -11,6 +16,9 @@ from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 import re
 
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "4"))
+BROWSER_IDLE_TIMEOUT = float(os.getenv("BROWSER_IDLE_TIMEOUT", "300"))  # seconds before an idle browser is closed
+
 
 class WebsiteContent(BaseModel):
     url: Optional[HttpUrl]
@@ -19,6 +27,11 @@ class WebsiteContent(BaseModel):
     links: List[HttpUrl]
 
 
+# Same parser as the helpers below: lxml would move text outside <body> (e.g. a bare <title>) into
+# an implied <head> and drop it from the extracted text.
+HTML_PARSER = "html.parser"
+
+
 def extract_body_content(html_content: str) -> str:
     soup = BeautifulSoup(html_content, "html.parser")
     body = soup.body or soup
@@ -33,12 +46,130 @@ def clean_body_content(body_content: str) -> str:
     return "\n".join(line.strip() for line in text.splitlines() if line.strip())
 
 
+def parse_page(html_content: str) -> Tuple[List[str], List[str]]:
+    """Parses a page once and returns its cleaned text blocks and absolute links.
+
+    Produces the same blocks as `clean_body_content(extract_body_content(html))`
+    split on newlines, without serialising and re-parsing the body in between.
+    """
+    soup = BeautifulSoup(html_content, HTML_PARSER)
+    links = [a["href"] for a in soup.find_all("a", href=True) if a["href"].startswith("http")]
+
+    body = soup.body or soup
+    body.smooth()  # merge adjacent strings (split by stray end tags), as re-parsing the serialized body did
+    for tag in body(["script", "style"]):
+        tag.decompose()
+    text = body.get_text(separator="\n")
+    text_blocks = [line.strip() for line in text.splitlines() if line.strip()]
+    return text_blocks or [""], links
+
+
+_driver_path: Optional[str] = None
+_driver_path_lock = threading.Lock()
+
+
+def resolve_driver_path() -> str:
+    """chromedriver path, resolved once per process (CHROMEDRIVER_PATH skips webdriver-manager entirely)."""
+    global _driver_path
+    if _driver_path is None:
+        # Concurrent first leases would otherwise each run the webdriver-manager download.
+        with _driver_path_lock:
+            if _driver_path is None:
+                _driver_path = os.getenv("CHROMEDRIVER_PATH") or ChromeDriverManager().install()
+    return _driver_path
+
+
+def chrome_options() -> Options:
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    return options
+
+
+class BrowserPool:
+    """Warm headless Chrome sessions leased per extraction; sessions idle longer than `idle_timeout` are closed."""
+
+    def __init__(self, max_size: int = BROWSER_POOL_SIZE, idle_timeout: float = BROWSER_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle: List[Tuple[webdriver.Chrome, float]] = []  # (driver, returned at), most recent last
+        self._all: Set[webdriver.Chrome] = set()  # idle and leased, so close() can quit every browser
+        self._reaper: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+
+    def _new_driver(self) -> webdriver.Chrome:
+        driver = webdriver.Chrome(service=Service(resolve_driver_path()), options=chrome_options())
+        with self._lock:
+            self._all.add(driver)
+        return driver
+
+    def _quit(self, driver: webdriver.Chrome):
+        with self._lock:
+            self._all.discard(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _reap(self):
+        while not self._closed.wait(max(self.idle_timeout / 2, 1)):
+            cutoff = time.monotonic() - self.idle_timeout
+            with self._lock:
+                expired = [driver for driver, returned_at in self._idle if returned_at < cutoff]
+                self._idle = [(driver, returned_at) for driver, returned_at in self._idle if returned_at >= cutoff]
+            for driver in expired:
+                self._quit(driver)
+
+    @contextmanager
+    def lease(self) -> Iterator[webdriver.Chrome]:
+        self._slots.acquire()
+        try:
+            with self._lock:
+                driver = self._idle.pop()[0] if self._idle else None
+            if driver is None:
+                driver = self._new_driver()
+            try:
+                yield driver
+            except Exception:
+                # The session may be wedged after a failed page; start fresh next time.
+                self._quit(driver)
+                raise
+            if self._closed.is_set():
+                self._quit(driver)
+                return
+            with self._lock:
+                self._idle.append((driver, time.monotonic()))
+                if self._reaper is None:
+                    self._reaper = threading.Thread(target=self._reap, name="browser-reaper", daemon=True)
+                    self._reaper.start()
+        finally:
+            self._slots.release()
+
+    def warm_up(self, count: int = 1):
+        """Resolves the driver and starts `count` browsers ahead of the first extraction."""
+        resolve_driver_path()
+        drivers = [self._new_driver() for _ in range(count)]
+        with self._lock:
+            self._idle.extend((driver, time.monotonic()) for driver in drivers)
+
+    def close(self):
+        """Quits every browser the pool started, including ones still leased."""
+        self._closed.set()
+        with self._lock:
+            drivers, self._idle = list(self._all), []
+        for driver in drivers:
+            self._quit(driver)
+
+
+_browser_pool = BrowserPool()
+atexit.register(_browser_pool.close)
+
+
 class WebsiteExtractor:
-    def __init__(self):
-        self.options = Options()
-        self.options.add_argument("--headless")
-        self.options.add_argument("--no-sandbox")
-        self.options.add_argument("--disable-dev-shm-usage")
+    def __init__(self, pool: Optional[BrowserPool] = None):
+        self.pool = pool or _browser_pool
 
     def _extract_domain_as_company(self, url: str) -> str:
         hostname = urlparse(url).hostname or ""
@@ -46,20 +177,14 @@ class WebsiteExtractor:
         return parts[0] if parts else "unknown"
 
     def extract(self, url: str) -> WebsiteContent:
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=self.options)
-        driver.get(url)
-        print(f"\U0001F30D Loaded: {url}")
-
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        html = driver.page_source
-        driver.quit()
+        with self.pool.lease() as driver:
+            driver.get(url)
+            print(f"\U0001F30D Loaded: {url}")
 
-        body = extract_body_content(html)
-        cleaned = clean_body_content(body)
-        text_blocks = cleaned.split("\n")
+            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+            html = driver.page_source
 
-        soup = BeautifulSoup(html, "html.parser")
-        links = [a["href"] for a in soup.find_all("a", href=True) if a["href"].startswith("http")]
+        text_blocks, links = parse_page(html)
 
         return WebsiteContent(
             url=url,
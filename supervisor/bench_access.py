@@ -0,0 +1,164 @@
+# bench_access.py
+# Compares the old three-parse extraction in access.py against parse_page on malformed and large synthetic pages,
+# and (with "browser", needs Chrome) cold per-call browsers against the warm BrowserPool.
+# Usage: python bench_access.py [sections ...]
+#        python bench_access.py browser [extractions]
+import sys
+import time
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from bs4 import BeautifulSoup
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+from access import (
+    HTML_PARSER, BrowserPool, WebsiteExtractor, chrome_options, clean_body_content,
+    extract_body_content, parse_page
+)
+
+
+def build_page(sections: int) -> str:
+    parts = [
+        "<!DOCTYPE html><html><head><title>Bench</title>",
+        "<style>body { color: #333; } .nav a { margin: 0 4px; }</style>",
+        "<script>window.dataLayer = []; function track(e) { return e; }</script>",
+        "</head><body>",
+        '<nav class="nav">' + "".join(f'<a href="https://example.com/nav/{i}">Nav {i}</a>' for i in range(30)) + "</nav>",
+        "<main>",
+    ]
+    for i in range(sections):
+        parts.append(
+            f'<section id="s{i}"><h2>Section {i} &amp; more</h2>'
+            f"<p>Paragraph {i} describes the product line in detail, with <b>bold</b> and <i>italic</i> text.</p>"
+            f"<ul><li>Feature {i}.1</li><li>Feature {i}.2</li><li>  Feature {i}.3  </li></ul>"
+            f'<a href="https://example.com/page/{i}">Read more</a> <a href="/relative/{i}">Relative</a>'
+            f"<script>track('{i}');</script><style>#s{i} {{ padding: {i % 8}px; }}</style>"
+            "</section>"
+        )
+    parts.append("</main><footer>&copy; Example Inc. All rights reserved.</footer></body></html>")
+    return "\n".join(parts)
+
+
+# Real pages are often not well-formed; the single parse must give the same output on them too.
+MALFORMED_PAGES = {
+    "no body": "<title>Shop</title><p>hello</p>",
+    "text before html": "intro<html><body><p>inside</p></body></html>",
+    "unclosed tags": "<body><div><p>one<p>two<li>three<b>bold <i>both</body>",
+    "two bodies": "<body><p>first</p></body><body><p>second</p></body>",
+    "stray end tags": "<p>a</div></span>b</p></td>c",
+    "unclosed script": "<body><p>kept</p><script>var x = '<p>hidden</p>';",
+    "entities": "<body><p>&lt;b&gt;not bold&lt;/b&gt; &amp;amp; &nbsp;x &copy</p></body>",
+    "text around script": "<body>before<script>x()</script>after<style>p {}</style>end</body>",
+    "text around comment": "<body>a<!-- c -->b</body>",
+    "comments": "<body><!-- <p>gone</p> --><p>shown</p><!-- unclosed",
+    "links outside body": '<a href="https://a.example/">A</a><body><a href="https://b.example/">B</a>',
+    "empty": "",
+}
+
+
+def check_parity() -> bool:
+    same = True
+    for name, html in MALFORMED_PAGES.items():
+        old, new = three_pass(html), parse_page(html)
+        if old != new:
+            same = False
+            print(f"MISMATCH {name}: {old} != {new}")
+    print(f"malformed pages: {len(MALFORMED_PAGES)} checked, {'all identical' if same else 'mismatches above'}")
+    return same
+
+
+def three_pass(html: str):
+    body = extract_body_content(html)
+    text_blocks = clean_body_content(body).split("\n")
+    soup = BeautifulSoup(html, "html.parser")
+    links = [a["href"] for a in soup.find_all("a", href=True) if a["href"].startswith("http")]
+    return text_blocks, links
+
+
+def measure(fn, html: str, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(html)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def main(sizes):
+    print(f"parse_page parser: {HTML_PARSER}")
+    check_parity()
+    print(f"{'sections':>8} {'page MB':>8} {'3-pass s':>9} {'1-pass s':>9} {'3-pass MB':>10} {'1-pass MB':>10} {'same':>5}")
+    for sections in sizes:
+        html = build_page(sections)
+        old, old_time, old_peak = measure(three_pass, html)
+        new, new_time, new_peak = measure(parse_page, html)
+        print(
+            f"{sections:>8} {len(html) / 1e6:>8.2f} {old_time:>9.3f} {new_time:>9.3f} "
+            f"{old_peak / 1e6:>10.1f} {new_peak / 1e6:>10.1f} {str(old == new):>5}"
+        )
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    body = b""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def cold_extract(url: str):
+    """The previous extract(): resolve the driver and start a fresh Chrome for every URL."""
+    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options())
+    try:
+        driver.get(url)
+        return parse_page(driver.page_source)
+    finally:
+        driver.quit()
+
+
+def bench_browser(extractions: int):
+    PageHandler.body = build_page(200).encode("utf-8")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+
+    cold = []
+    for _ in range(extractions):
+        start = time.perf_counter()
+        cold_extract(url)
+        cold.append(time.perf_counter() - start)
+
+    pool = BrowserPool(max_size=1)
+    extractor = WebsiteExtractor(pool=pool)
+    warm = []
+    for _ in range(extractions):
+        start = time.perf_counter()
+        extractor.extract(url)
+        warm.append(time.perf_counter() - start)
+    pool.close()
+    server.shutdown()
+
+    print(f"{'':>6} {'first s':>8} {'rest avg s':>11} {'total s':>8}")
+    for label, times in (("cold", cold), ("warm", warm)):
+        rest = times[1:] or times
+        print(f"{label:>6} {times[0]:>8.2f} {sum(rest) / len(rest):>11.2f} {sum(times):>8.2f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == "browser":
+        bench_browser(int(args[1]) if len(args) > 1 else 5)
+    else:
+        main([int(arg) for arg in args] or [250, 1000, 4000])
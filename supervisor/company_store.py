@@ -0,0 +1,154 @@
+# company_store.py
+# Read-through layer over company.company_data: collector results still inside their freshness window
+# are served from MongoDB, and only stale sources are scraped again.
+import os
+import time
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+from pymongo import DESCENDING, MongoClient
+
+from db import get_client
+
+DB_NAME = "company"
+FRESHNESS_HOURS = {
+    "website": float(os.getenv("WEBSITE_FRESH_HOURS", "168")),
+    "hacker_news": float(os.getenv("HN_FRESH_HOURS", "24")),
+    "youtube": float(os.getenv("YOUTUBE_FRESH_HOURS", "168")),
+}
+HN_ARTICLE_LIMIT = 20
+
+
+def _age(scraped_at) -> Optional[timedelta]:
+    if not scraped_at:
+        return None
+    if isinstance(scraped_at, str):
+        scraped_at = datetime.fromisoformat(scraped_at)
+    if scraped_at.tzinfo is None:
+        scraped_at = scraped_at.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - scraped_at
+
+
+class ReadThroughStats:
+    def __init__(self):
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.seconds_saved: Dict[str, float] = {}
+        self.unmeasured_hits: Dict[str, int] = {}
+        self.refresh_seconds: Dict[str, float] = {}
+
+    def hit(self, source: str, seconds: Optional[float]):
+        self.hits[source] = self.hits.get(source, 0) + 1
+        if seconds is None:
+            self.unmeasured_hits[source] = self.unmeasured_hits.get(source, 0) + 1
+        else:
+            self.seconds_saved[source] = self.seconds_saved.get(source, 0.0) + seconds
+
+    def miss(self, source: str, seconds: float):
+        self.misses[source] = self.misses.get(source, 0) + 1
+        self.refresh_seconds[source] = self.refresh_seconds.get(source, 0.0) + seconds
+
+    def saved(self, source: str) -> float:
+        # Results written by data_pull_tools carry no timing; count them at this run's average refresh time.
+        misses = self.misses.get(source, 0)
+        average = self.refresh_seconds.get(source, 0.0) / misses if misses else 0.0
+        return self.seconds_saved.get(source, 0.0) + self.unmeasured_hits.get(source, 0) * average
+
+    def report(self) -> str:
+        lines = []
+        for source in FRESHNESS_HOURS:
+            hits, misses = self.hits.get(source, 0), self.misses.get(source, 0)
+            if hits + misses:
+                lines.append(f"{source}: {hits}/{hits + misses} from store ({hits / (hits + misses):.0%}), "
+                             f"~{self.saved(source):.1f}s saved")
+        total = sum(self.saved(source) for source in FRESHNESS_HOURS)
+        return "\n".join(lines + [f"total: ~{total:.1f}s saved"])
+
+
+class CompanyDataStore:
+    """
+    Reads website, Hacker News and YouTube results for a company from company.company_data.
+
+    Results written by data_pull_tools (hacker_news + hn_posts, youtube.<product>) are used when fresh;
+    results refreshed here are written back under `supervisor.<source>` with the time they took.
+    """
+
+    def __init__(self, client: MongoClient, freshness_hours: Dict[str, float] = None):
+        self.company_data = client[DB_NAME]["company_data"]
+        self.hn_posts = client[DB_NAME]["hn_posts"]
+        self.freshness = {source: timedelta(hours=h) for source, h in (freshness_hours or FRESHNESS_HOURS).items()}
+        self.stats = ReadThroughStats()
+
+    @classmethod
+    def from_env(cls) -> Optional["CompanyDataStore"]:
+        """None when MONGO_URI is not configured, so callers fall back to scraping everything."""
+        client = get_client()
+        return cls(client) if client is not None else None
+
+    @staticmethod
+    def company_key(name: str) -> str:
+        return name.strip().lower()
+
+    def _fresh(self, source: str, scraped_at) -> bool:
+        age = _age(scraped_at)
+        return age is not None and age <= self.freshness[source]
+
+    def lookup(self, source: str, name: str):
+        """(value, seconds it took to produce or None) when a fresh result is stored, else None."""
+        key = self.company_key(name)
+        doc = self.company_data.find_one({"company": key}, {"supervisor": 1, "hacker_news": 1}) or {}
+        cached = (doc.get("supervisor") or {}).get(source)
+        if cached and self._fresh(source, cached.get("scraped_at")):
+            return cached["value"], cached.get("seconds")
+
+        if source == "hacker_news":
+            hacker_news = doc.get("hacker_news") or {}
+            if "last_created_at_i" in hacker_news and self._fresh(source, hacker_news.get("scraped_at")):
+                posts = self.hn_posts.find({"companies": key}, {"_id": 0, "title": 1, "url": 1})
+                posts = posts.sort("created_at_i", DESCENDING).limit(HN_ARTICLE_LIMIT)
+                return [f"{p.get('title', '')} - {p.get('url', '')}" for p in posts if p.get("title")], None
+        elif source == "youtube":
+            # data_pull_tools keys YouTube summaries by the first word of the product name.
+            product_key = key.replace(" ", "_")
+            yt_doc = self.company_data.find_one(
+                {"company": key.split()[0]}, {f"youtube.{product_key}": 1}
+            ) or {}
+            summary = (yt_doc.get("youtube") or {}).get(product_key) or {}
+            if summary.get("summary") and self._fresh(source, summary.get("scraped_at")):
+                return summary["summary"], None
+        return None
+
+    def save(self, source: str, name: str, value, seconds: float):
+        self.company_data.update_one(
+            {"company": self.company_key(name)},
+            {"$set": {f"supervisor.{source}": {
+                "value": value,
+                "seconds": round(seconds, 3),
+                "scraped_at": datetime.now(timezone.utc).isoformat()
+            }}},
+            upsert=True
+        )
+
+    async def read_through(self, source: str, name: str, refresh: Callable[[], Awaitable],
+                           cacheable: Callable[[object], bool] = lambda value: True):
+        try:
+            cached = await asyncio.to_thread(self.lookup, source, name)
+        except Exception as e:
+            print(f"⚠️ Store lookup failed for {name} ({source}): {e}")
+            cached = None
+        if cached is not None:
+            value, seconds = cached
+            self.stats.hit(source, seconds)
+            return value
+
+        start = time.perf_counter()
+        value = await refresh()
+        seconds = time.perf_counter() - start
+        self.stats.miss(source, seconds)
+        if cacheable(value):
+            try:
+                await asyncio.to_thread(self.save, source, name, value, seconds)
+            except Exception as e:
+                print(f"⚠️ Store write failed for {name} ({source}): {e}")
+        return value
@@ -0,0 +1,25 @@
+# db.py
+# MongoDB access for the supervisor; optional, everything falls back to local files or scraping without MONGO_URI.
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from shared import mongo_registry
+
+load_dotenv()
+
+MONGO_URI = os.getenv("MONGO_URI")
+
+
+def get_client() -> Optional[MongoClient]:
+    """The registry's pooled client for MONGO_URI; None when MONGO_URI is not configured."""
+    return mongo_registry.get_client(MONGO_URI) if MONGO_URI else None
+
+
+def get_collection(db_name: str, collection_name: str):
+    client = get_client()
+    if client is None:
+        raise RuntimeError("MONGO_URI is not set")
+    return client[db_name][collection_name]
@@ -0,0 +1,93 @@
+# inputs.py
+# Loads the chat session and company catalog the supervisor works on: straight from MongoDB when
+# configured, otherwise streamed from the offline JSON exports.
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+
+from db import MONGO_URI, get_collection
+from shared import iter_json_items
+
+CHAT_DB_NAME = os.getenv("CHAT_DB_NAME", "chatbot_db")
+CHAT_COLLECTION_NAME = os.getenv("CHAT_COLLECTION_NAME", "chat_sessions")
+COMPANY_DB_NAME = os.getenv("COMPANY_DB_NAME", "application_db1")
+COMPANY_COLLECTION_NAME = os.getenv("COMPANY_COLLECTION_NAME", "applications1")
+INPUT_SOURCE = os.getenv("SUPERVISOR_INPUT_SOURCE", "mongo" if MONGO_URI else "files")
+CURSOR_BATCH_SIZE = int(os.getenv("CURSOR_BATCH_SIZE", "200"))
+
+# Only the fields build_catalog and the scrapers use.
+COMPANY_PROJECTION = {
+    "_id": 0,
+    "application": 1,
+    "search_terms": 1,
+    "google_search_terms": 1,
+    "companies.name": 1,
+    "companies.website": 1,
+    "companies.address": 1,
+    "companies.types": 1,
+}
+
+
+def load_session_from_mongo(session_uuid: Optional[str] = None) -> Optional[Dict]:
+    """
+    One chat session as {"session_uuid", "messages"}: the given one, or the most recent.
+    Sessions stored in several message buckets are read oldest bucket first and joined.
+    """
+    collection = get_collection(CHAT_DB_NAME, CHAT_COLLECTION_NAME)
+    if session_uuid is None:
+        latest = collection.find_one({}, {"session_uuid": 1, "messages": 1}, sort=[("_id", DESCENDING)])
+        if latest is None:
+            return None
+        session_uuid = latest.get("session_uuid")
+        if session_uuid is None:
+            # Export without session ids: the newest document is the whole session.
+            return {"session_uuid": None, "messages": latest.get("messages", [])}
+
+    cursor = collection.find(
+        {"session_uuid": session_uuid},
+        {"_id": 0, "messages": 1},
+        batch_size=CURSOR_BATCH_SIZE
+    ).sort([("first_ts", ASCENDING), ("_id", ASCENDING)])
+    messages = [message for bucket in cursor for message in bucket.get("messages", [])]
+    if not messages:
+        return None
+    return {"session_uuid": session_uuid, "messages": messages}
+
+
+def iter_companies_from_mongo(batch_size: int = CURSOR_BATCH_SIZE) -> Iterator[Dict]:
+    """Application blocks with their companies, streamed from the catalog collection batch by batch."""
+    collection = get_collection(COMPANY_DB_NAME, COMPANY_COLLECTION_NAME)
+    yield from collection.find({}, COMPANY_PROJECTION, batch_size=batch_size)
+
+
+def load_session_from_file(path: str, session_uuid: Optional[str] = None) -> Optional[Dict]:
+    """The first session in a chat export (or the one with `session_uuid`), read without parsing the rest."""
+    for session in iter_json_items(path):
+        if session_uuid is None or session.get("session_uuid") == session_uuid:
+            return session
+    return None
+
+
+def load_inputs(
+    chat_path: str = "chatbot_db.chat_sessions.json",
+    company_path: str = "companies.json",
+    session_uuid: Optional[str] = None,
+    source: str = INPUT_SOURCE
+) -> Tuple[List[Dict], Iterator[Dict]]:
+    """
+    ([session], application blocks). The catalog is returned as an iterator and is meant to be consumed once.
+    `source` is "mongo" or "files" (SUPERVISOR_INPUT_SOURCE; defaults to mongo when MONGO_URI is set).
+    """
+    if source == "mongo":
+        session = load_session_from_mongo(session_uuid)
+        company_data = iter_companies_from_mongo()
+    else:
+        for path in (chat_path, company_path):
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+        session = load_session_from_file(chat_path, session_uuid)
+        company_data = iter_json_items(company_path)
+    if session is None:
+        raise ValueError(f"❌ No chat session found{f' for {session_uuid}' if session_uuid else ''}")
+    return [session], company_data
@@ -35,3 +35,9 @@ Your output will be evaluated by whether each selected company is:
 - Clearly aligned with the user's intent (from chat)
 - Justified by real scraped evidence (text, links, articles)
 """
+
+selection_message = """
+You pick companies for a user. You are given the user's chat history and a numbered list of candidate companies.
+Return only the companies that clearly match the user's needs, as a JSON list of their numbers, e.g. [3, 7, 12].
+Return [] if none match. Do not include any other text.
+"""
@@ -0,0 +1,133 @@
+# retrieval.py
+# Local BM25 index over the company catalog, used to shortlist companies for a chat before the LLM picks.
+import os
+import json
+import math
+import hashlib
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+from urllib.parse import urlparse
+
+from shared import tokenize
+
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "50"))
+COMPANY_INDEX_FILE = os.getenv("COMPANY_INDEX_FILE", "company_index.json")
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def company_key(company: Dict) -> str:
+    return f"{company.get('name', '').strip().lower()}|{company.get('website') or ''}"
+
+
+def company_text(company: Dict, application: Dict = None) -> str:
+    """Searchable text for a company: its own fields plus the application and search terms it was found for."""
+    parts = [company.get("name", ""), company.get("address") or "", " ".join(company.get("types") or [])]
+    website = company.get("website")
+    if website:
+        parts.append((urlparse(website).hostname or "").replace("www.", "").replace(".", " "))
+    if company.get("scraped_text"):
+        parts.append(company["scraped_text"])
+    if application:
+        parts.append(application.get("application", ""))
+        parts.append(" ".join(application.get("search_terms") or application.get("google_search_terms") or []))
+    return "\n".join(p for p in parts if p)
+
+
+def build_catalog(company_data: Iterable[Dict]) -> Dict[str, Tuple[Dict, str]]:
+    """company key -> (company, text) for every company in every application block."""
+    catalog = {}
+    for application in company_data:
+        for company in application.get("companies", []):
+            key = company_key(company)
+            if key in catalog:
+                # Found for several applications: index all of them.
+                existing, text = catalog[key]
+                catalog[key] = (existing, text + "\n" + company_text({}, application))
+            else:
+                catalog[key] = (company, company_text(company, application))
+    return catalog
+
+
+class CompanyIndex:
+    """
+    BM25 over company texts, updated incrementally: only companies whose text changed are re-indexed.
+    Term counts are persisted to `path`; postings are rebuilt from them on load.
+    """
+
+    def __init__(self, path: str = COMPANY_INDEX_FILE):
+        self.path = path
+        self.docs: Dict[str, Dict] = {}  # key -> {"company", "terms", "length", "signature"}
+        self.postings: Dict[str, Dict[str, int]] = {}  # term -> {key: term frequency}
+        self.total_length = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for key, doc in json.load(f).items():
+                        self._add(key, doc)
+            except (OSError, ValueError) as e:
+                print(f"Rebuilding unreadable company index {path}: {e}")
+                self.docs, self.postings, self.total_length = {}, {}, 0
+
+    def _add(self, key: str, doc: Dict):
+        self.docs[key] = doc
+        self.total_length += doc["length"]
+        for term, tf in doc["terms"].items():
+            self.postings.setdefault(term, {})[key] = tf
+
+    def remove(self, key: str):
+        doc = self.docs.pop(key, None)
+        if doc is None:
+            return
+        self.total_length -= doc["length"]
+        for term in doc["terms"]:
+            keys = self.postings.get(term)
+            if keys is not None:
+                keys.pop(key, None)
+                if not keys:
+                    del self.postings[term]
+
+    def upsert(self, key: str, company: Dict, text: str) -> bool:
+        """Indexes a company; returns False when its text is unchanged and nothing had to be done."""
+        signature = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        existing = self.docs.get(key)
+        if existing and existing["signature"] == signature:
+            existing["company"] = company
+            return False
+        self.remove(key)
+        terms = Counter(tokenize(text))
+        self._add(key, {"company": company, "terms": dict(terms), "length": sum(terms.values()), "signature": signature})
+        return True
+
+    def sync(self, catalog: Dict[str, Tuple[Dict, str]]) -> Tuple[int, int]:
+        """Brings the index in line with the catalog; returns (re-indexed, removed) counts."""
+        removed = [key for key in self.docs if key not in catalog]
+        for key in removed:
+            self.remove(key)
+        changed = sum(self.upsert(key, company, text) for key, (company, text) in catalog.items())
+        return changed, len(removed)
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.docs, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K) -> List[Tuple[Dict, float]]:
+        n = len(self.docs)
+        if not n:
+            return []
+        avg_length = self.total_length / n or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            keys = self.postings.get(term)
+            if not keys:
+                continue
+            idf = math.log(1 + (n - len(keys) + 0.5) / (len(keys) + 0.5))
+            for key, tf in keys.items():
+                length_norm = 1 - BM25_B + BM25_B * self.docs[key]["length"] / avg_length
+                scores[key] = scores.get(key, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.docs[key]["company"], score) for key, score in ranked]
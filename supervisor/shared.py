@@ -0,0 +1,15 @@
+# shared.py
+# Modules the supervisor shares with the rest of the repository instead of keeping its own copies.
+# The supervisor runs from its own directory, so the directories holding them are added to the import path.
+import sys
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parent.parent
+for _path in (_ROOT, _ROOT / "data_pull_tools"):
+    if str(_path) not in sys.path:
+        sys.path.append(str(_path))  # appended, so the supervisor's own modules still take precedence
+
+from summarization import chunk_text, count_tokens  # noqa: E402
+from relevance import filter_relevant, tokenize  # noqa: E402
+from db_utils.json_stream import iter_json_items  # noqa: E402
+import mongo_registry  # noqa: E402,F401
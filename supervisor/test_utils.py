@@ -0,0 +1,67 @@
+import bson
+import pytest
+
+import utils
+
+
+def test_website_output_is_bson_encodable():
+    output = utils.ScraperOutput(text_content=["Acme builds rockets."], links=["https://acme.com/about"])
+    value = output.model_dump(mode="json")
+    assert bson.decode(bson.encode({"value": value}))["value"] == {
+        "text_content": ["Acme builds rockets."],
+        "links": ["https://acme.com/about"],
+    }
+
+
+@pytest.mark.parametrize("summary", ["", utils.NO_TRANSCRIPTS_SUMMARY, utils.FAILED_SUMMARY, "YouTube error: timeout"])
+def test_placeholder_summaries_are_not_cached(summary):
+    assert not utils.summary_cacheable(summary)
+
+
+def test_real_summary_is_cached():
+    assert utils.summary_cacheable("Reviewers praise the battery life.")
+
+
+REPEATED_WORD_VTT = """WEBVTT
+
+00:00:00.000 --> 00:00:01.000
+Did you say no
+
+00:00:01.000 --> 00:00:02.000
+no way it works
+
+00:00:02.000 --> 00:00:03.000
+it works fine
+"""
+
+ROLLING_VTT = """WEBVTT
+
+00:00:00.000 --> 00:00:02.000
+ 
+the new<00:00:00.500><c> model</c>
+
+00:00:02.000 --> 00:00:02.010
+the new model
+ 
+
+00:00:02.010 --> 00:00:04.000
+the new model
+makes<00:00:02.500><c> setup fast</c>
+"""
+
+
+def test_manual_captions_keep_words_repeated_across_cues():
+    assert utils.VideoProcessor.merge_vtt_cues(REPEATED_WORD_VTT) == "Did you say no no way it works it works fine"
+
+
+def test_auto_captions_drop_the_repeated_line():
+    assert utils.VideoProcessor.merge_vtt_cues(ROLLING_VTT, rolling=True) == "the new model makes setup fast"
+
+
+def test_pick_caption_url_reports_auto_captions():
+    manual = {"subtitles": {"en": [{"ext": "vtt", "url": "manual"}]},
+              "automatic_captions": {"en": [{"ext": "vtt", "url": "auto"}]}}
+    auto = {"automatic_captions": {"en-US": [{"ext": "json3", "url": "x"}, {"ext": "vtt", "url": "auto"}]}}
+    assert utils.VideoProcessor.pick_caption_url(manual) == ("manual", False)
+    assert utils.VideoProcessor.pick_caption_url(auto) == ("auto", True)
+    assert utils.VideoProcessor.pick_caption_url({}) == (None, False)
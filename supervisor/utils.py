@@ -1,8 +1,15 @@
 import os
 import json
 import re
+import html
+import time
 import asyncio
-from typing import List, Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import AsyncIterator, List, Dict
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlparse
 from pydantic import BaseModel, HttpUrl
 from dotenv import load_dotenv
 import httpx
@@ -10,10 +17,13 @@ from youtubesearchpython import VideosSearch
 import yt_dlp
 from huggingface_hub import InferenceClient
 from openai import OpenAI
-from pydantic_models import CompanyScrapedData, PiggyBank
+from pydantic_models import CompanyScrapedData
 from access import WebsiteExtractor
+from shared import chunk_text, count_tokens, filter_relevant
+from retrieval import RETRIEVAL_TOP_K, CompanyIndex, build_catalog, company_key
+from company_store import CompanyDataStore
 from pydantic_ai import Agent
-from prompts import system_message
+from prompts import selection_message
 
 load_dotenv()
 
@@ -21,7 +31,37 @@ HF_TOKEN = os.getenv("HF_TOKEN")
 HF_MODEL = "meta-llama/Llama-2-7b-chat-hf"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 GPT_MODEL = "gpt-3.5-turbo"
-CHUNK_SIZE = 3000
+NO_TRANSCRIPTS_SUMMARY = "No usable transcripts found."
+FAILED_SUMMARY = "Summary unavailable: summarization failed."
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "1500"))  # max tokens of transcript per summary call
+YTDLP_WORKERS = int(os.getenv("YTDLP_WORKERS", "8"))       # videos fetched in parallel
+VIDEO_TIMEOUT = float(os.getenv("VIDEO_TIMEOUT", "120"))   # seconds allowed per video
+SOCKET_TIMEOUT = 30
+HF_CLEANUP = os.getenv("HF_CLEANUP", "0") == "1"  # extra LLM pass after the local caption merge
+CAPTION_FILLERS = {"uh", "um"}
+TRANSCRIPT_DIR = os.getenv("TRANSCRIPT_DIR", "transcripts")
+TRANSCRIPT_MAX_AGE_DAYS = int(os.getenv("TRANSCRIPT_MAX_AGE_DAYS", "30"))
+SEARCH_CACHE_FILE = os.getenv("SEARCH_CACHE_FILE", "youtube_search_cache.json")
+SEARCH_CACHE_TTL_HOURS = float(os.getenv("SEARCH_CACHE_TTL_HOURS", "24"))
+HN_SEARCH_URL = "https://hn.algolia.com/api/v1/search"
+HN_CONCURRENCY = int(os.getenv("HN_CONCURRENCY", "16"))   # companies fetched in parallel
+HN_CACHE_TTL_MINUTES = float(os.getenv("HN_CACHE_TTL_MINUTES", "60"))
+HN_CACHE_MAX_ENTRIES = int(os.getenv("HN_CACHE_MAX_ENTRIES", "1000"))
+HN_TIMEOUT = 20
+# Per-stage limits for the company pipeline in analyze_chat_and_scrape
+WEBSITE_CONCURRENCY = int(os.getenv("WEBSITE_CONCURRENCY", "4"))   # browsers open at once
+YOUTUBE_CONCURRENCY = int(os.getenv("YOUTUBE_CONCURRENCY", "4"))   # companies searching/downloading videos
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))   # companies summarizing transcripts
+SELECTION_MODEL = "openai:gpt-4o"
+SELECTION_BATCH_SIZE = int(os.getenv("SELECTION_BATCH_SIZE", "40"))  # candidates per LLM selection call
+
+_ytdlp_executor = ThreadPoolExecutor(max_workers=YTDLP_WORKERS, thread_name_prefix="yt-dlp")
+# Shared keep-alive connections for caption downloads from the worker threads.
+_http_client = httpx.Client(
+    timeout=SOCKET_TIMEOUT,
+    follow_redirects=True,
+    limits=httpx.Limits(max_connections=YTDLP_WORKERS, max_keepalive_connections=YTDLP_WORKERS)
+)
 
 class ScraperInput(BaseModel):
     name: str
@@ -39,45 +79,241 @@ class ProductInput(BaseModel):
 
 async def run_scraper_tool_logic(input_data: ScraperInput) -> ScraperOutput:
     extractor = WebsiteExtractor()
-    result = extractor.extract(input_data.website)
+    # Selenium blocks; keep it off the event loop so other companies progress meanwhile.
+    result = await asyncio.to_thread(extractor.extract, input_data.website)
     return ScraperOutput(
         text_content=result.text_content,
         links=result.links
     )
 
+# Normalized company -> (expires_at monotonic seconds, articles)
+_hn_cache: Dict[str, tuple] = {}
+
+def new_hn_client() -> httpx.AsyncClient:
+    """Pooled client sized for HN_CONCURRENCY; use it with `async with` so its connections are closed."""
+    return httpx.AsyncClient(
+        timeout=HN_TIMEOUT,
+        limits=httpx.Limits(max_connections=HN_CONCURRENCY, max_keepalive_connections=HN_CONCURRENCY)
+    )
+
+def _prune_hn_cache(now: float):
+    for key in [key for key, (expires_at, _) in _hn_cache.items() if expires_at < now]:
+        del _hn_cache[key]
+    # Entries are added in expiry order, so the first ones are the closest to expiring.
+    while len(_hn_cache) > HN_CACHE_MAX_ENTRIES:
+        del _hn_cache[next(iter(_hn_cache))]
+
+async def _fetch_hn_articles(client, company) -> List[str]:
+    response = await client.get(HN_SEARCH_URL, params={"query": company, "tags": "story"})
+    response.raise_for_status()
+    posts = response.json().get("hits", [])
+    return [f"{post.get('title', '')} - {post.get('url', '')}" for post in posts if post.get("title")]
+
+async def run_hn_scraper_batch(companies: List[str], client: httpx.AsyncClient = None) -> Dict[str, List[str]]:
+    """
+    HN headlines for many companies, fetched concurrently over one pooled client; repeats come from a TTL cache.
+    Without a `client`, one is opened for the batch and closed after it.
+    """
+    keys = {company: company.strip().lower() for company in companies}
+    _prune_hn_cache(time.monotonic())
+    cached = {key: _hn_cache[key][1] for key in keys.values() if key in _hn_cache}
+    missing = list(dict.fromkeys(key for key in keys.values() if key not in cached))
+
+    semaphore = asyncio.Semaphore(HN_CONCURRENCY)
+
+    async def fetch(client, key):
+        try:
+            async with semaphore:
+                articles = await _fetch_hn_articles(client, key)
+        except Exception as e:
+            return [f"HN error: {e}"]  # errors are returned but not cached
+        _hn_cache.pop(key, None)
+        _hn_cache[key] = (time.monotonic() + HN_CACHE_TTL_MINUTES * 60, articles)
+        return articles
+
+    fetched = {}
+    if missing:
+        async with new_hn_client() if client is None else nullcontext(client) as client:
+            fetched = dict(zip(missing, await asyncio.gather(*(fetch(client, key) for key in missing))))
+    _prune_hn_cache(time.monotonic())
+    return {company: fetched[key] if key in fetched else cached[key] for company, key in keys.items()}
+
 async def run_hn_scraper_tool_logic(input_data: HNScrapeInput) -> List[str]:
-    try:
-        url = f"https://hn.algolia.com/api/v1/search?query={input_data.company.strip()}&tags=story"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            result = response.json()
-        posts = result.get("hits", [])
-        return [f"{post.get('title', '')} - {post.get('url', '')}" for post in posts if post.get("title")]
-    except Exception as e:
-        return [f"HN error: {e}"]
+    return (await run_hn_scraper_batch([input_data.company]))[input_data.company]
+
+class TranscriptStore:
+    """Transcripts keyed by YouTube video id, one JSON file per video, shared by all products."""
+
+    def __init__(self, root=TRANSCRIPT_DIR, max_age_days=TRANSCRIPT_MAX_AGE_DAYS):
+        self.root = root
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()  # put/add_product read-modify-write a record from worker threads
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, video_id):
+        return os.path.join(self.root, f"{re.sub(r'[^A-Za-z0-9_-]', '_', video_id)}.json")
+
+    def _write(self, record):
+        path = self._path(record["video_id"])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def get(self, video_id, fresh_only=True):
+        """Stored record, or None when missing (or stale, unless `fresh_only` is False)."""
+        try:
+            with open(self._path(video_id), 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if fresh_only:
+            fetched_at = datetime.fromisoformat(record.get("fetched_at", "1970-01-01T00:00:00+00:00"))
+            if datetime.now(timezone.utc) - fetched_at > timedelta(days=self.max_age_days):
+                return None
+        return record
+
+    def put(self, video_id, video_url, video_title, raw_vtt, transcript, product):
+        with self._lock:
+            existing = self.get(video_id, fresh_only=False) or {}
+            products = existing.get("products", [])
+            self._write({
+                "video_id": video_id,
+                "video_url": video_url,
+                "video_title": video_title,
+                "raw_vtt": raw_vtt,
+                "transcript": transcript,
+                "products": products + [product] if product not in products else products,
+                "fetched_at": datetime.now(timezone.utc).isoformat(),
+                "created_at": existing.get("created_at", datetime.now(timezone.utc).isoformat())
+            })
+
+    def add_product(self, video_id, product):
+        with self._lock:
+            record = self.get(video_id, fresh_only=False)
+            if record and product not in record.get("products", []):
+                record.setdefault("products", []).append(product)
+                self._write(record)
+
+class SearchCache:
+    """YouTube search results keyed by normalized query, kept in one JSON file for `ttl_hours`."""
+
+    def __init__(self, path=SEARCH_CACHE_FILE, ttl_hours=SEARCH_CACHE_TTL_HOURS):
+        self.path = path
+        self.ttl_hours = ttl_hours
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
 
-class YTDLogger:
-    def __init__(self, log_file): self.log_file = log_file
-    def debug(self, msg): self._write(msg)
-    def warning(self, msg): self._write(msg)
-    def error(self, msg): self._write(msg)
-    def _write(self, msg): open(self.log_file, 'a', encoding='utf-8').write(msg + '\n')
+    @staticmethod
+    def normalize(query):
+        return re.sub(r"\s+", " ", query).strip().lower()
+
+    def get(self, query, max_results):
+        """Cached URLs, or None when missing, expired, or searched with a smaller limit."""
+        with self._lock:
+            entry = self._entries.get(self.normalize(query))
+        if not entry or entry["max_results"] < max_results:
+            return None
+        searched_at = datetime.fromisoformat(entry["searched_at"])
+        if datetime.now(timezone.utc) - searched_at > timedelta(hours=self.ttl_hours):
+            return None
+        return entry["urls"][:max_results]
+
+    def put(self, query, max_results, urls):
+        with self._lock:
+            self._entries[self.normalize(query)] = {
+                "max_results": max_results,
+                "urls": urls,
+                "searched_at": datetime.now(timezone.utc).isoformat()
+            }
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+_search_cache = None
+
+def _get_search_cache():
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = SearchCache()
+    return _search_cache
 
 class VideoProcessor:
-    def __init__(self, hf_token, hf_model):
+    def __init__(self, hf_token, hf_model, executor=None, store=None, search_cache=None):
         self.client = InferenceClient(model=hf_model, token=hf_token)
+        self.executor = executor or _ytdlp_executor
+        self.store = store or TranscriptStore()
+        self.search_cache = search_cache or _get_search_cache()
 
     @staticmethod
     def sanitize(name): return re.sub(r'[\\/*?:"<>|]', "", name).strip()
 
     @staticmethod
-    def extract_text_from_vtt(vtt):
-        lines = vtt.splitlines()
+    def _vtt_seconds(timestamp):
+        seconds = 0.0
+        for part in timestamp.strip().split(':'):
+            seconds = seconds * 60 + float(part)
+        return seconds
+
+    @staticmethod
+    def parse_vtt_cues(vtt):
+        """(start, end, text) per cue, with inline tags, entities and [Music]-style markers stripped."""
+        vtt = html.unescape(re.sub(r'<[^>]*>', '', vtt.replace('\r\n', '\n')))
+        vtt = re.sub(r'\[[^\]\n]*\]', ' ', vtt)
+        cues = []
+        to_seconds = VideoProcessor._vtt_seconds
+        for block in vtt.split('\n\n'):
+            lines = block.strip('\n').split('\n')
+            # The timing line comes first, or second after an optional cue identifier.
+            timing = 0 if '-->' in lines[0] else 1
+            if timing >= len(lines) or '-->' not in lines[timing]:
+                continue
+            text = ' '.join(' '.join(lines[timing + 1:]).split())
+            if text:
+                start, _, rest = lines[timing].partition('-->')
+                end = rest.split(None, 1)[0] if rest.strip() else start
+                cues.append((to_seconds(start), to_seconds(end), text))
+        return cues
+
+    @staticmethod
+    def merge_vtt_cues(vtt, pause=2.0, max_overlap=64, rolling=False):
+        """Joins caption cues into plain text, starting a new line whenever the speaker pauses
+        for more than `pause` seconds.
+
+        With `rolling` (YouTube auto captions), every cue repeats the previous line, so only each
+        cue's new suffix is kept: the longest word overlap between the running text's tail and
+        the cue's head is dropped. Other captions are kept word for word, so speech that really
+        repeats across a cue boundary ("did you say no" / "no way") is not lost.
+        """
+        words, keys = [], []
+        lines, line_start, last_end = [], 0, None
+        for start, end, text in VideoProcessor.parse_vtt_cues(vtt):
+            if last_end is not None and start - last_end > pause and len(words) > line_start:
+                lines.append(words[line_start:])
+                line_start = len(words)
+            last_end = end if last_end is None else max(last_end, end)
+
+            cue_words = text.split()
+            cue_keys = text.lower().split()
+            first = cue_keys[0]
+            overlap = 0
+            for k in range(min(len(cue_keys), len(keys), max_overlap) if rolling else 0, 0, -1):
+                if keys[-k] == first and keys[-k:] == cue_keys[:k]:
+                    overlap = k
+                    break
+            words.extend(cue_words[overlap:])
+            keys.extend(cue_keys[overlap:])
+        if len(words) > line_start:
+            lines.append(words[line_start:])
+
         return '\n'.join(
-            re.sub(r'<[^>]+>', '', line).strip()
+            ' '.join(w for w in line if w.lower() not in CAPTION_FILLERS)
             for line in lines
-            if line.strip() and '-->' not in line and not line.startswith(('WEBVTT', 'Kind:', 'Language:')) and '[Music]' not in line
         )
 
     def clean_text(self, raw_text):
@@ -91,69 +327,120 @@ class VideoProcessor:
             return raw_text
 
     def get_video_urls(self, query, max_results=10):
+        cached = self.search_cache.get(query, max_results)
+        if cached is not None:
+            return cached
         results = VideosSearch(f"{query} demo OR review", limit=max_results).result()['result']
-        return [r['link'] for r in results]
+        urls = [r['link'] for r in results]
+        self.search_cache.put(query, max_results, urls)
+        return urls
+
+    @staticmethod
+    def pick_caption_url(info):
+        """
+        (English VTT caption URL, whether it is an auto caption track) from a yt-dlp info dict,
+        preferring manual subtitles over auto captions; (None, False) when there is none.
+        """
+        for auto, tracks in ((False, info.get('subtitles') or {}), (True, info.get('automatic_captions') or {})):
+            langs = ['en'] + sorted(lang for lang in tracks if lang.startswith('en') and lang != 'en')
+            for lang in langs:
+                for fmt in tracks.get(lang) or []:
+                    if fmt.get('ext') == 'vtt' and fmt.get('url'):
+                        return fmt['url'], auto
+        return None, False
 
-    async def download_and_clean(self, video_url, output_dir):
-        os.makedirs(output_dir, exist_ok=True)
-        with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
+    @staticmethod
+    def video_id(video_url):
+        """YouTube video id from a watch, youtu.be or shorts URL."""
+        parsed = urlparse(video_url)
+        if parsed.hostname and parsed.hostname.endswith("youtu.be"):
+            return parsed.path.lstrip("/").split("/")[0] or None
+        query_id = parse_qs(parsed.query).get("v")
+        if query_id:
+            return query_id[0]
+        parts = [p for p in parsed.path.split("/") if p]
+        if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live"):
+            return parts[1]
+        return None
+
+    def _fetch_captions(self, video_url):
+        """Blocking work for one video; returns (title, raw_vtt, whether the captions are auto-generated)."""
+        with yt_dlp.YoutubeDL({'quiet': True, 'skip_download': True, 'socket_timeout': SOCKET_TIMEOUT}) as ydl:
             info = ydl.extract_info(video_url, download=False)
-            title = self.sanitize(info.get('title', 'video'))
-            base_path = os.path.join(output_dir, title)
-            vtt_file = f"{base_path}.en.vtt"
-            json_file = f"{base_path}.json"
-
-        if os.path.exists(json_file):
-            return
-
-        ydl_opts = {
-            'quiet': True,
-            'writesubtitles': True,
-            'writeautomaticsub': True,
-            'skip_download': True,
-            'subtitleslangs': ['en'],
-            'subtitlesformat': 'vtt',
-            'outtmpl': base_path + '.%(ext)s',
-            'logger': YTDLogger(base_path + ".log")
-        }
+        title = info.get('title', 'video')
+
+        raw = None
+        caption_url, auto = self.pick_caption_url(info)
+        if caption_url:
+            response = _http_client.get(caption_url)
+            response.raise_for_status()
+            raw = response.text
+        return title, raw, auto
+
+    async def download_and_clean(self, video_url, product_name):
+        """Makes sure a fresh transcript for the video is in the store; returns its video id."""
+        video_id = self.video_id(video_url)
+        if not video_id:
+            return None
+        # Transcript files hold the raw VTT too; read and write them off the event loop.
+        if await asyncio.to_thread(self.store.get, video_id) is not None:
+            await asyncio.to_thread(self.store.add_product, video_id, product_name)
+            return video_id
+
+        loop = asyncio.get_running_loop()
+        try:
+            # yt-dlp is blocking; run it on the bounded worker pool so videos download concurrently.
+            title, raw, auto = await asyncio.wait_for(
+                loop.run_in_executor(self.executor, self._fetch_captions, video_url),
+                timeout=VIDEO_TIMEOUT
+            )
 
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([video_url])
+            cleaned = self.merge_vtt_cues(raw, rolling=auto) if raw is not None else ""
+            if cleaned and HF_CLEANUP:
+                cleaned = await loop.run_in_executor(self.executor, self.clean_text, cleaned)
 
-        if os.path.exists(vtt_file):
-            with open(vtt_file, 'r', encoding='utf-8') as f:
-                raw = f.read()
-            loop = asyncio.get_running_loop()
-            cleaned = await loop.run_in_executor(None, self.clean_text, self.extract_text_from_vtt(raw))
-        else:
-            cleaned = ""
+            await asyncio.to_thread(self.store.put, video_id, video_url, title, raw, cleaned, product_name)
+            return video_id
 
-        with open(json_file, 'w', encoding='utf-8') as jf:
-            json.dump({
-                "video_title": title,
-                "video_url": video_url,
-                "transcript": cleaned
-            }, jf, indent=2, ensure_ascii=False)
+        except asyncio.TimeoutError:
+            print(f"Download timed out after {VIDEO_TIMEOUT}s: {video_url}")
+        except Exception as e:
+            # A private or removed video (or a failed caption fetch) only drops that video.
+            print(f"Download failed: {video_url}: {e}")
+        return None
 
 class TranscriptSummarizer:
-    def __init__(self, transcript_dir, product_name):
-        self.dir = transcript_dir
+    def __init__(self, store, video_ids, product_name, website_text=""):
+        self.store = store
+        self.video_ids = video_ids
         self.client = OpenAI(api_key=OPENAI_API_KEY)
         self.product = product_name.lower()
+        self.website_text = website_text or ""
+        self.relevance = {}
 
     def _load_transcripts(self):
         texts = []
-        for f in os.listdir(self.dir):
-            if f.endswith(".json"):
-                with open(os.path.join(self.dir, f), 'r', encoding='utf-8') as fp:
-                    data = json.load(fp)
-                    transcript = data.get("transcript", "")
-                    if transcript.strip():
-                        texts.append(transcript.strip())
-        return "\n\n".join(texts)
+        for video_id in self.video_ids:
+            data = self.store.get(video_id, fresh_only=False) or {}
+            transcript = data.get("transcript", "")
+            if transcript.strip():
+                texts.append(transcript.strip())
+
+        # Drop off-topic videos before any tokens are spent on them.
+        kept, _ = filter_relevant(self.product, texts, context=self.website_text)
+        kept_set = set(kept)
+        skipped_tokens = sum(count_tokens(text) for i, text in enumerate(texts) if i not in kept_set)
+        self.relevance = {
+            "transcripts_used": len(kept),
+            "transcripts_skipped": len(texts) - len(kept),
+            "skipped_tokens": skipped_tokens
+        }
+        print(f"🎯 Relevance for {self.product}: kept {len(kept)}/{len(texts)} transcripts, skipped ~{skipped_tokens} tokens")
+        return "\n\n".join(texts[i] for i in kept)
 
     def _chunk_text(self, text):
-        return [text[i:i + CHUNK_SIZE] for i in range(0, len(text), CHUNK_SIZE)]
+        # Same token-aware chunking as data_pull_tools: lines, then sentences, then words.
+        return chunk_text(text, SUMMARY_CHUNK_TOKENS)
 
     async def _summarize_chunk(self, text):
         prompt = (
@@ -178,89 +465,253 @@ class TranscriptSummarizer:
             return ""
 
     async def summarize(self):
-        text = self._load_transcripts()
+        text = await asyncio.to_thread(self._load_transcripts)
         if not text:
-            return {"summary": "No usable transcripts found."}
+            return {"summary": NO_TRANSCRIPTS_SUMMARY, **self.relevance}
 
         chunks = self._chunk_text(text)
         partials = await asyncio.gather(*[self._summarize_chunk(chunk) for chunk in chunks if chunk.strip()])
-        combined = "\n\n".join(partials)
-        final = await self._summarize_chunk(combined)
-
-        output_path = os.path.join(self.dir, "combined_summary.json")
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump({
-                "product_name": self.product,
-                "summary": final
-            }, f, indent=2, ensure_ascii=False)
-        return {"transcripts_cleaned": True, "summary": final}
-
-async def run_video_processor(product_name: str):
+        combined = "\n\n".join(p for p in partials if p)
+        if not combined:
+            return {"summary": FAILED_SUMMARY, **self.relevance}
+        # If the final pass fails, the chunk summaries are still better than nothing.
+        final = await self._summarize_chunk(combined) or combined
+        return {"transcripts_cleaned": True, "summary": final, **self.relevance}
+
+class SharedDownloads:
+    """Video downloads shared by every product in a run: each URL is fetched once, later requests await the same task."""
+
+    def __init__(self, processor: VideoProcessor):
+        self.processor = processor
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def fetch(self, url, product_name):
+        task = self._tasks.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self.processor.download_and_clean(url, product_name))
+            self._tasks[url] = task
+            return await asyncio.shield(task)
+        video_id = await asyncio.shield(task)
+        if video_id:
+            await asyncio.to_thread(self.processor.store.add_product, video_id, product_name)
+        return video_id
+
+def summary_cacheable(summary: str) -> bool:
+    """Only real summaries are stored; placeholders and errors are produced again on the next run."""
+    return bool(summary) and summary not in (NO_TRANSCRIPTS_SUMMARY, FAILED_SUMMARY) \
+        and not summary.startswith("YouTube error:")
+
+async def fetch_product_videos(downloads: SharedDownloads, product_name: str) -> List[str]:
+    """Searches one product and fetches its videos through the shared downloads; returns video ids."""
+    processor = downloads.processor
+    loop = asyncio.get_running_loop()
+    urls = await loop.run_in_executor(processor.executor, processor.get_video_urls, product_name, 10)
+    video_ids = await asyncio.gather(*(downloads.fetch(url, product_name) for url in urls))
+    return list(dict.fromkeys(v for v in video_ids if v))
+
+async def collect_product_videos(processor: VideoProcessor, product_names: List[str]) -> Dict[str, List[str]]:
+    """Searches every product, fetching each distinct video once for the whole batch; returns video ids per product."""
+    downloads = SharedDownloads(processor)
+    results = await asyncio.gather(
+        *(fetch_product_videos(downloads, name) for name in product_names), return_exceptions=True
+    )
+    for name, result in zip(product_names, results):
+        if isinstance(result, Exception):
+            print(f"⚠️ Video search failed for {name}: {result}")
+    return {name: [] if isinstance(result, Exception) else result for name, result in zip(product_names, results)}
+
+async def run_video_processors(product_names: List[str], website_texts: Dict[str, str] = None) -> Dict[str, dict]:
+    product_names = list(dict.fromkeys(product_names))
+    website_texts = website_texts or {}
     processor = VideoProcessor(HF_TOKEN, HF_MODEL)
-    base_dir = f"{VideoProcessor.sanitize(product_name)}_captions"
-    os.makedirs(base_dir, exist_ok=True)
-
-    urls = processor.get_video_urls(product_name, max_results=10)
-    await asyncio.gather(*(processor.download_and_clean(url, base_dir) for url in urls))
-
-    summarizer = TranscriptSummarizer(transcript_dir=base_dir, product_name=product_name)
-    return await summarizer.summarize()
-
-async def get_matching_companies_from_chat(chat_data, company_data, agent) -> List[Dict]:
-    import json
- 
-    session = chat_data[0]
-    messages = session.get("messages", [])
-    if not messages:
-        raise ValueError("❌ No messages found in chat_data[0]['messages']. Please check JSON format.")
-
+    video_ids = await collect_product_videos(processor, product_names)
+
+    summaries = await asyncio.gather(*(
+        TranscriptSummarizer(
+            store=processor.store,
+            video_ids=video_ids[name],
+            product_name=name,
+            website_text=website_texts.get(name, "")
+        ).summarize()
+        for name in product_names
+    ))
+    return dict(zip(product_names, summaries))
+
+async def run_video_processor(product_name: str, website_text: str = ""):
+    return (await run_video_processors([product_name], {product_name: website_text}))[product_name]
+
+_company_index = None
+
+def _get_company_index() -> CompanyIndex:
+    global _company_index
+    if _company_index is None:
+        _company_index = CompanyIndex()
+    return _company_index
+
+def format_chat(session: Dict) -> str:
     chat_text = ""
-    for msg in messages:
+    for msg in session.get("messages", []):
         role = msg.get("role", "")
         if role == "user":
             chat_text += f"User: {msg.get('answer', '').strip()}\n"
         elif role == "assistant":
             chat_text += f"Assistant: {msg.get('question', '').strip()}\n"
+    return chat_text
 
-    all_companies = company_data[0].get("companies", [])
-    formatted = [f"{c['name']} - {c.get('website', '')}" for c in all_companies]
-
-    prompt = (
-        f"User chat history:\n{chat_text}\n\n"
-        f"Companies:\n{chr(10).join(formatted)}\n\n"
-        "Return a list of the most relevant companies in this format:\n"
-        "[{\"name\": \"CompanyName\", \"website\": \"https://...\"}, ...]"
-    )
-
-    response = await agent.run(prompt)
-    print("🧾 Raw result:", response.output)
-    return json.loads(response.content)
-
-async def analyze_chat_and_scrape(chat_data, company_data) -> List[CompanyScrapedData]:
-
-    agent = Agent(
-    system_message=system_message,
-    tools=[],
-    model="gpt-4o",
-    backend="openai",
-    output_model=PiggyBank
-)
-    selected = await get_matching_companies_from_chat(chat_data, company_data, agent)
+async def _select_companies(agent, chat_text: str, candidates: List[Dict]) -> List[Dict]:
+    """One LLM call choosing from a numbered candidate list; numbers keep the answer short and unambiguous."""
+    numbered = [f"{i}. {c['name']} - {c.get('website') or ''}" for i, c in enumerate(candidates, 1)]
+    prompt = f"User chat history:\n{chat_text}\n\nCompanies:\n{chr(10).join(numbered)}"
+    try:
+        response = await agent.run(prompt)
+        match = re.search(r"\[[\d,\s]*\]", response.output)
+        picks = json.loads(match.group(0)) if match else []
+    except Exception as e:
+        print(f"⚠️ Company selection failed: {e}")
+        return []
+    return [candidates[i - 1] for i in dict.fromkeys(picks) if isinstance(i, int) and 1 <= i <= len(candidates)]
+
+async def _select_in_batches(agent, chat_text: str, candidates: List[Dict], keep_unpicked: bool = False) -> List[Dict]:
+    """
+    Judges the candidates in SELECTION_BATCH_SIZE batches in parallel and returns the picks, deduplicated.
+    With `keep_unpicked`, a batch that comes back empty (failed call or unparsable answer) keeps all of its
+    candidates, so earlier picks are never lost to one bad response.
+    """
+    batches = [candidates[i:i + SELECTION_BATCH_SIZE] for i in range(0, len(candidates), SELECTION_BATCH_SIZE)]
+    picked = await asyncio.gather(*(_select_companies(agent, chat_text, batch) for batch in batches))
+    if keep_unpicked:
+        picked = [picks or batch for picks, batch in zip(picked, batches)]
+    return list({company_key(c): c for picks in picked for c in picks}.values())
+
+async def get_matching_companies_from_chat(chat_data, company_data, agent, index: CompanyIndex = None) -> List[Dict]:
+    session = chat_data[0]
+    if not session.get("messages"):
+        raise ValueError("❌ No messages found in chat_data[0]['messages']. Please check JSON format.")
+    chat_text = format_chat(session)
+
+    # Shortlist locally so the prompt size no longer grows with the catalog.
+    index = index or _get_company_index()
+    reindexed, removed = index.sync(build_catalog(company_data))
+    if reindexed or removed:
+        index.save()
+    candidates = [company for company, _ in index.search(chat_text, RETRIEVAL_TOP_K)]
+    print(f"🔎 Shortlisted {len(candidates)} of {len(index.docs)} companies ({reindexed} re-indexed, {removed} removed)")
+    if not candidates:
+        # No term in common with the catalog: let the model judge every company, as before the shortlist.
+        candidates = [doc["company"] for doc in index.docs.values()]
+        print(f"🔎 Empty shortlist; selecting from the full catalog of {len(candidates)} companies")
+
+    # Map: each batch of candidates is judged in parallel. Reduce: the picks are judged again, batch by
+    # batch, until they fit one call; a pass that drops nothing more ends the loop.
+    selected = await _select_in_batches(agent, chat_text, candidates)
+    while len(selected) > SELECTION_BATCH_SIZE:
+        reduced = await _select_in_batches(agent, chat_text, selected, keep_unpicked=True)
+        if len(reduced) >= len(selected):
+            break
+        selected = reduced
+
+    return [{"name": c["name"], "website": c.get("website")} for c in selected]
+
+async def scrape_companies_stream(selected: List[Dict], store: CompanyDataStore = None) -> AsyncIterator[CompanyScrapedData]:
+    """
+    Runs the website, HN and YouTube collectors for every company concurrently, each stage under its
+    own limit, and yields each company's CompanyScrapedData as soon as it is ready.
+    A failing collector leaves an empty or error value for that source; the rest still complete.
+
+    With a CompanyDataStore (by default when MONGO_URI is set), results still inside their freshness
+    window are read from company.company_data and only stale sources are scraped and written back.
+    """
+    store = CompanyDataStore.from_env() if store is None else store
+    website_stage = asyncio.Semaphore(WEBSITE_CONCURRENCY)
+    hn_stage = asyncio.Semaphore(HN_CONCURRENCY)
+    youtube_stage = asyncio.Semaphore(YOUTUBE_CONCURRENCY)
+    summary_stage = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+    downloads = SharedDownloads(VideoProcessor(HF_TOKEN, HF_MODEL))
+    hn_client = new_hn_client()  # shared by every company in the run, closed when the run ends
+
+    async def in_stage(stage, coro):
+        async with stage:
+            return await coro
+
+    async def read_through(source, name, refresh, cacheable):
+        if store is None:
+            return await refresh()
+        return await store.read_through(source, name, refresh, cacheable)
+
+    async def scrape_website(name, website):
+        output = await in_stage(website_stage, run_scraper_tool_logic(ScraperInput(name=name, website=website)))
+        return output.model_dump(mode="json")  # HttpUrl links as strings, so the result can be stored
+
+    async def scrape_hn(name):
+        return (await in_stage(hn_stage, run_hn_scraper_batch([name], hn_client)))[name]
+
+    async def scrape_youtube(name, website_task):
+        video_ids = await in_stage(youtube_stage, fetch_product_videos(downloads, name))
+        # Summarizing waits for the website, whose text feeds the transcript relevance check.
+        try:
+            website_text = " ".join((await website_task)["text_content"])
+        except Exception:
+            website_text = ""
+        summarizer = TranscriptSummarizer(
+            store=downloads.processor.store,
+            video_ids=video_ids,
+            product_name=name,
+            website_text=website_text
+        )
+        return (await in_stage(summary_stage, summarizer.summarize()))["summary"]
 
-    results = []
-    for company in selected:
+    async def collect(company) -> CompanyScrapedData:
         name = company["name"]
-        website = company["website"]
+        website_task = asyncio.ensure_future(read_through(
+            "website", name, lambda: scrape_website(name, company["website"]),
+            cacheable=lambda data: bool(data["text_content"])
+        ))
+        website_data, hn_data, yt_summary = await asyncio.gather(
+            website_task,
+            read_through(
+                "hacker_news", name, lambda: scrape_hn(name),
+                cacheable=lambda articles: not any(a.startswith("HN error:") for a in articles)
+            ),
+            read_through("youtube", name, lambda: scrape_youtube(name, website_task), cacheable=summary_cacheable),
+            return_exceptions=True
+        )
 
-        website_data = await run_scraper_tool_logic(ScraperInput(name=name, website=website))
-        hn_data = await run_hn_scraper_tool_logic(HNScrapeInput(company=name))
-        yt_data = await run_video_processor(name)
+        if isinstance(website_data, Exception):
+            print(f"⚠️ Website scrape failed for {name}: {website_data}")
+            website_data = ScraperOutput(text_content=[], links=[]).model_dump(mode="json")
+        if isinstance(hn_data, Exception):
+            hn_data = [f"HN error: {hn_data}"]
+        if isinstance(yt_summary, Exception):
+            yt_summary = f"YouTube error: {yt_summary}"
 
-        results.append(CompanyScrapedData(
+        return CompanyScrapedData(
             name=name,
             website_scraper=website_data,
             hn_articles=hn_data,
-            yt_scraper=yt_data["summary"]
-        ))
+            yt_scraper=yt_summary
+        )
+
+    tasks = [asyncio.create_task(collect(company)) for company in selected]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                yield await next_done
+            except Exception as e:
+                print(f"⚠️ Company pipeline failed: {e}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await hn_client.aclose()
+    if store is not None:
+        print(f"📦 Stored results reused this run:\n{store.stats.report()}")
+
+async def analyze_chat_and_scrape(chat_data, company_data) -> List[CompanyScrapedData]:
+
+    agent = Agent(SELECTION_MODEL, system_prompt=selection_message)
+    selected = await get_matching_companies_from_chat(chat_data, company_data, agent)
 
-    return results
+    # The stream yields in completion order; callers get the companies in the order they were selected.
+    position = {company["name"]: i for i, company in enumerate(selected)}
+    results = [result async for result in scrape_companies_stream(selected)]
+    return sorted(results, key=lambda result: position.get(result.name, len(position)))